@@ -0,0 +1,165 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import plots
+
+# Command line entry point for the plots, tables and statistics that are
+# otherwise produced by uncommenting calls at the bottom of plots.py and
+# memory-plots.py. Run from this directory, e.g.
+#
+#   python analyze.py plot Fibonacci NQueens --percentiles
+#   python analyze.py memory SpawnManyActors --versions SC_opt_speed
+#   python analyze.py tables MatrixMultiplication
+#   python analyze.py stats Fibonacci --versions GCD_opt_none SC_opt_none --json
+#   python analyze.py export
+#   python analyze.py report
+#   python analyze.py autocorrelation Fibonacci
+#   python analyze.py tables NQueens --ci block_bootstrap
+#
+# Only 'plot' and 'memory' import matplotlib, so the other commands start
+# quickly enough to be run in a loop from scripts.
+
+# Render to file without a GUI backend. Must run before pyplot is imported.
+def use_file_backend():
+    import matplotlib
+    matplotlib.use('Agg')
+
+# Versions may be given with or without their leading '_'
+def version_key(name):
+    key = name if name.startswith('_') else '_' + name
+
+    if key not in plots.benchmark_versions:
+        raise argparse.ArgumentTypeError('unknown version ' + repr(name) + ' (one of ' + ', '.join([v.lstrip('_') for v in plots.benchmark_versions]) + ')')
+
+    return key
+
+def benchmark_name(name):
+    if name not in plots.benchmark_titles:
+        raise argparse.ArgumentTypeError('unknown benchmark ' + repr(name) + ' (one of ' + ', '.join(plots.benchmark_titles) + ')')
+
+    return name
+
+def plot_command(args):
+    if not args.show:
+        use_file_backend()
+
+    for benchmark in args.benchmarks:
+        plots.plot_benchmark(benchmark, save_to_file = not args.show, percentiles = args.percentiles, versions = args.versions)
+
+        if args.histograms:
+            plots.plot_latency_histograms(benchmark, save_to_file = not args.show)
+
+def memory_command(args):
+    if not args.show:
+        use_file_backend()
+
+    mp = plots.memory_plots()
+
+    for benchmark in args.benchmarks:
+        for version in args.versions:
+            filename = mp.memory_filename(benchmark, version)
+
+            # Not every version has a profile (e.g. NQueens_SC_opt_none)
+            if not os.path.exists(filename):
+                print('-- Skipping', filename, '(no such log) --')
+                continue
+
+            if args.show:
+                mp.plot_benchmark(benchmark, version)
+            else:
+                mp.plot_version_to_file(benchmark, version, None if args.zoom else [])
+
+def tables_command(args):
+    for benchmark in args.benchmarks:
+        if args.to_file:
+            plots.generate_comparison_tables_to_file(benchmark)
+        else:
+            plots.generate_comparison_tables(benchmark)
+
+# Mean and variance of every bench_param (see plots.get_stats), as text
+# or as JSON mapping benchmark -> version -> bench_param -> [mean, variance]
+def stats_command(args):
+    res = {}
+
+    for benchmark in args.benchmarks:
+        res[benchmark] = {version: plots.get_stats(benchmark, version) for version in args.versions}
+
+    if args.json:
+        json.dump(res, sys.stdout, indent = 2)
+        print()
+        return
+
+    for (benchmark, versions) in res.items():
+        print('\n-- ' + benchmark + ' --\n')
+
+        for (version, stats) in versions.items():
+            for (bench_param, (mean, variance)) in stats.items():
+                print('{:<14} N = {:<6} mean {:0.6e} s, variance {:0.3e}'.format(plots.benchmark_versions[version], bench_param, mean, variance))
+
+def export_command(args):
+    plots.export_comparisons(args.benchmarks, args.csv, args.json, args.confidence, args.versions)
+
+def autocorrelation_command(args):
+    plots.print_autocorrelation_report(args.benchmarks, args.confidence, args.versions)
+
+def report_command(args):
+    importlib.import_module('report').write_report(args.benchmarks, args.output)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Plots, tables and statistics of the BenchApp logs')
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+
+    # Benchmark and version selection, shared by every command
+    selection = argparse.ArgumentParser(add_help = False)
+    selection.add_argument('benchmarks', nargs = '*', type = benchmark_name, help = 'default: all six')
+    selection.add_argument('--versions', nargs = '+', type = version_key, help = 'e.g. GCD_opt_none SC_opt_speed (default: all six)')
+    selection.add_argument('--ci', choices = ['normal', 'block_bootstrap'], default = plots.ci_method, help = 'how confidence intervals are computed (see plots.ci_method)')
+
+    plot_parser = subparsers.add_parser('plot', parents = [selection], help = 'execution time plots, to Execution-time-plots/')
+    plot_parser.add_argument('--percentiles', action = 'store_true', help = 'tail percentiles instead of mean and CI')
+    plot_parser.add_argument('--histograms', action = 'store_true', help = 'latency histograms as well, to Latency-histograms/')
+    plot_parser.add_argument('--show', action = 'store_true', help = 'show on screen instead of saving')
+    plot_parser.set_defaults(run = plot_command)
+
+    memory_parser = subparsers.add_parser('memory', parents = [selection], help = 'memory consumption plots, to Memory-plots/')
+    memory_parser.add_argument('--no-zoom', dest = 'zoom', action = 'store_false', help = 'skip the "zoomed in" plots')
+    memory_parser.add_argument('--show', action = 'store_true', help = 'show on screen instead of saving')
+    memory_parser.set_defaults(run = memory_command)
+
+    tables_parser = subparsers.add_parser('tables', parents = [selection], help = 'LaTeX tables of the GCD - SC differences')
+    tables_parser.add_argument('--to-file', action = 'store_true', help = 'write to Comparison-tables/ instead of stdout')
+    tables_parser.set_defaults(run = tables_command)
+
+    stats_parser = subparsers.add_parser('stats', parents = [selection], help = 'mean and variance of every bench_param')
+    stats_parser.add_argument('--json', action = 'store_true')
+    stats_parser.set_defaults(run = stats_command)
+
+    export_parser = subparsers.add_parser('export', parents = [selection], help = 'pairwise version comparisons as CSV and JSON')
+    export_parser.add_argument('--csv', default = 'comparisons.csv')
+    export_parser.add_argument('--json', default = 'comparisons.json')
+    export_parser.add_argument('--confidence', type = float, default = 0.95)
+    export_parser.set_defaults(run = export_command)
+
+    autocorrelation_parser = subparsers.add_parser('autocorrelation', parents = [selection], help = 'effective sample sizes and block bootstrap intervals')
+    autocorrelation_parser.add_argument('--confidence', type = float, default = 0.95)
+    autocorrelation_parser.set_defaults(run = autocorrelation_command)
+
+    report_parser = subparsers.add_parser('report', parents = [selection], help = 'zoomable HTML report of every memory and runtime series')
+    report_parser.add_argument('--output', help = 'default: Report/index.html')
+    report_parser.set_defaults(run = report_command)
+
+    args = parser.parse_args(argv)
+    plots.ci_method = args.ci
+
+    if not args.benchmarks:
+        args.benchmarks = list(plots.benchmark_titles.keys())
+    if args.versions is None:
+        args.versions = list(plots.benchmark_versions.keys())
+
+    args.run(args)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+import numpy as np
+import benchstats
+import logparser
+import logstore
+import memstats
+import plots
+
+## Settings
+
+database_filename = 'baseline.sqlite'
+
+# Number of most recent earlier runs of a configuration that
+# make up its baseline
+baseline_runs = 5
+
+# Slowdowns (and memory growth) smaller than this fraction of the
+# baseline are never flagged, however significant they are
+regression_threshold = 0.05
+
+# Confidence of the one-sided tests
+regression_confidence = 0.95
+
+# One row per run of a configuration (benchmark, version, bench_param),
+# i.e. per bench_param of an ingested log. 'kind' is 'time' for
+# execution time logs, whose values are the per-iteration runtimes in
+# seconds, and 'memory' for memory consumption profiles, whose single
+# value is the peak memory (Mb) of that bench_param's segment.
+schema = '''
+create table if not exists runs (
+    id integer primary key,
+    kind text not null,
+    benchmark text not null,
+    version text not null,
+    param integer not null,
+    date text not null,
+    source text not null,
+    source_hash text not null,
+    unique (kind, source_hash, param)
+);
+
+create table if not exists run_values (
+    run_id integer not null references runs (id),
+    iteration integer not null,
+    value real not null
+);
+
+create index if not exists runs_by_configuration on runs (kind, benchmark, version, param, date);
+create index if not exists run_values_by_run on run_values (run_id);
+'''
+
+def connect(filename = database_filename):
+    db = sqlite3.connect(filename)
+    db.executescript(schema)
+    return db
+
+# E.g. 'Official-execution-time/Fibonacci/Fibonacci_GCD_opt_none' --> '_GCD_opt_none'
+def version_of(filename, benchmark):
+    return os.path.basename(filename)[len(benchmark):]
+
+# Memory consumption profiles announce the sampler in their first lines
+def is_memory_profile(filename):
+    with open(filename, errors = 'replace') as f:
+        for (_, line) in zip(range(5), f):
+            if line.startswith('Starting memory measurement'):
+                return True
+
+    return False
+
+# Date of the file's last modification, for logs that carry no date of their own
+def modification_date(filename):
+    return datetime.fromtimestamp(os.path.getmtime(filename), timezone.utc).isoformat(timespec = 'seconds')
+
+def insert_run(db, kind, benchmark, version, param, date, source, source_hash, values):
+    cursor = db.execute(
+        'insert or ignore into runs (kind, benchmark, version, param, date, source, source_hash) values (?, ?, ?, ?, ?, ?, ?)',
+        (kind, benchmark, version, int(param), date, source, source_hash))
+
+    # Already ingested
+    if cursor.rowcount == 0:
+        return False
+
+    values = [(cursor.lastrowid, i, float(value)) for (i, value) in enumerate(values) if not np.isnan(value)]
+    db.executemany('insert into run_values (run_id, iteration, value) values (?, ?, ?)', values)
+
+    return True
+
+# Add every bench_param of a log (of either kind) to the baseline store.
+# Memory profiles are dated by their first sample, execution time logs
+# by 'date' or else their modification time. Logs already in the store
+# (by content hash) are skipped. Returns the number of runs added.
+def ingest(db, filename, date = None):
+    source_hash = logstore.content_hash(filename)
+    added = 0
+
+    if is_memory_profile(filename):
+        profile = logstore.load_memory_profile(filename)
+        kind, benchmark, params = 'memory', profile.benchmark, profile.params
+        values = [[segment.peak] for segment in memstats.segments(profile)]
+
+        if date is None and len(profile.timestamps) > 0:
+            date = datetime.fromtimestamp(int(profile.timestamps[0]), timezone.utc).isoformat(timespec = 'seconds')
+    else:
+        log = logstore.load_execution_time_log(filename)
+        kind, benchmark, params = 'time', log.benchmark, log.params
+        values = log.samples
+
+    if date is None:
+        date = modification_date(filename)
+
+    version = version_of(filename, benchmark)
+
+    with db:
+        for (param, run_values) in zip(params, values):
+            added += insert_run(db, kind, benchmark, version, param, date, filename, source_hash, run_values)
+
+    return added
+
+# Values of the 'runs' most recent runs of a configuration, excluding
+# the log with 'source_hash' (the run being checked), one list per run
+def baseline_values(db, kind, benchmark, version, param, source_hash, runs = baseline_runs):
+    run_ids = db.execute(
+        'select id from runs where kind = ? and benchmark = ? and version = ? and param = ? and source_hash != ? '
+        'order by date desc, id desc limit ?',
+        (kind, benchmark, version, int(param), source_hash, runs)).fetchall()
+
+    return [[value for (value,) in db.execute('select value from run_values where run_id = ? order by iteration', run_id)] for run_id in run_ids]
+
+# Compare the runtimes of a new run with those of its baseline runs,
+# after discarding the warm-up of each. The iterations of one run are
+# not independent of the run: every run (a fresh launch of BenchApp)
+# has its own mean, so with two or more baseline runs, the new run's
+# mean is compared with the k baseline means as in check_memory, and
+# flagged when it is slower by more than 'threshold' and above the
+# one-sided prediction bound mean + t * s * sqrt(1 + 1/k). A single
+# baseline run has no spread between runs to go by; then Welch's
+# one-sided test of the iterations of both runs decides, i.e. whether
+# the lower confidence bound of new / baseline is above 1, which
+# assumes that the two runs' means differ by their within-run noise
+# alone. 'bound' is the prediction bound as a change over the baseline
+# mean, or with a single baseline run, that lower bound of the change.
+def check_runtime(new_samples, baseline, threshold, confidence):
+    kept, _ = plots.discard_warmup(logparser.padded_array([new_samples] + baseline))
+    summary = benchstats.summarize(kept)
+    new_mean = float(summary.mean[0])
+    means = summary.mean[1:]
+    mean = float(means.mean())
+    k = len(means)
+
+    if k > 1:
+        bound = mean + float(benchstats.t_quantile(confidence, k - 1)) * float(means.std(ddof = 1)) * np.sqrt(1 + 1 / k)
+        change_bound = float(bound / mean - 1)
+        significant = new_mean > bound
+    else:
+        comparison = benchstats.welch_comparison(benchstats.summarize(kept[::-1]), 1 - 2 * (1 - confidence))
+        change_bound = float(comparison.speedup_lower[1, 0]) - 1
+        significant = change_bound > 0
+
+    return {
+        'baseline': mean,
+        'new': new_mean,
+        'change': new_mean / mean - 1,
+        'bound': change_bound,
+        'regression': bool(new_mean > mean * (1 + threshold) and significant)
+    }
+
+# Compare the peak memory of a new run with the peaks of its baseline
+# runs. Flagged when it grew by more than 'threshold' and, given two or
+# more baseline runs, lies above the one-sided prediction bound
+# mean + t * s * sqrt(1 + 1/k) of the k baseline peaks.
+def check_memory(new_peak, baseline, threshold, confidence):
+    peaks = np.array([values[0] for values in baseline])
+    mean = float(peaks.mean())
+    k = len(peaks)
+
+    if k > 1:
+        bound = mean + float(benchstats.t_quantile(confidence, k - 1)) * float(peaks.std(ddof = 1)) * np.sqrt(1 + 1 / k)
+    else:
+        bound = mean
+
+    return {
+        'baseline': mean,
+        'new': new_peak,
+        'change': new_peak / mean - 1,
+        'bound': bound / mean - 1,
+        'regression': bool(new_peak > mean * (1 + threshold) and new_peak > bound)
+    }
+
+# Check every bench_param of a log against its baseline in the store.
+# Returns one finding per bench_param that has a baseline, see
+# check_runtime and check_memory for what is compared.
+def check(db, filename, runs = baseline_runs, threshold = regression_threshold, confidence = regression_confidence):
+    source_hash = logstore.content_hash(filename)
+    findings = []
+
+    if is_memory_profile(filename):
+        profile = logstore.load_memory_profile(filename)
+        kind, benchmark, params = 'memory', profile.benchmark, profile.params
+        values = [[segment.peak] for segment in memstats.segments(profile)]
+    else:
+        log = logstore.load_execution_time_log(filename)
+        kind, benchmark, params = 'time', log.benchmark, log.params
+        values = log.samples
+
+    version = version_of(filename, benchmark)
+
+    for (param, new_values) in zip(params, values):
+        # Memory segments too short to hold a single sample have no peak
+        new_values = [value for value in new_values if not np.isnan(value)]
+        baseline = [values for values in baseline_values(db, kind, benchmark, version, param, source_hash, runs) if len(values) > 0]
+
+        if len(baseline) == 0 or len(new_values) == 0:
+            continue
+
+        if kind == 'time':
+            finding = check_runtime(new_values, baseline, threshold, confidence)
+        else:
+            finding = check_memory(new_values[0], baseline, threshold, confidence)
+
+        finding.update({
+            'kind': kind,
+            'benchmark': benchmark,
+            'version': version,
+            'param': int(param),
+            'baseline_runs': len(baseline)
+        })
+        findings.append(finding)
+
+    return findings
+
+def print_finding(finding):
+    unit = ' s' if finding['kind'] == 'time' else ' Mb'
+
+    print(('REGRESSION ' if finding['regression'] else 'ok         ')
+        + finding['benchmark'] + finding['version'] + ' N = ' + str(finding['param']) + ' (' + finding['kind'] + '): '
+        + '{:0.4g}'.format(finding['new']) + unit + ' vs. ' + '{:0.4g}'.format(finding['baseline']) + unit
+        + ' ({:+0.1%}'.format(finding['change']) + ', ' + str(finding['baseline_runs']) + ' baseline run(s))')
+
+# Ingest logs with 'python baseline.py ingest <log>...', and gate a
+# release with 'python baseline.py check <log>...', which exits with
+# status 1 if any bench_param regressed against its baseline
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Baseline store and performance regression check for BenchApp logs')
+    parser.add_argument('--database', default = database_filename)
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+
+    ingest_parser = subparsers.add_parser('ingest', help = 'add logs to the baseline store')
+    ingest_parser.add_argument('logs', nargs = '+')
+    ingest_parser.add_argument('--date', help = 'date of the run (default: from the log, or its modification time)')
+
+    check_parser = subparsers.add_parser('check', help = 'compare logs with their baseline, exit 1 on regression')
+    check_parser.add_argument('logs', nargs = '+')
+    check_parser.add_argument('--runs', type = int, default = baseline_runs)
+    check_parser.add_argument('--threshold', type = float, default = regression_threshold)
+    check_parser.add_argument('--confidence', type = float, default = regression_confidence)
+
+    args = parser.parse_args(argv)
+    db = connect(args.database)
+
+    if args.command == 'ingest':
+        for filename in args.logs:
+            print('Ingested', ingest(db, filename, args.date), 'run(s) from', filename)
+        return 0
+
+    regressions = 0
+    for filename in args.logs:
+        for finding in check(db, filename, args.runs, args.threshold, args.confidence):
+            print_finding(finding)
+            regressions += finding['regression']
+
+    print(regressions, 'regression(s)')
+    return 1 if regressions > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+from collections import namedtuple
+from statistics import NormalDist
+import numpy as np
+
+## Settings
+
+# z for a 95% confidence interval (3.291 for 99.9%)
+# z table: https://www.math.arizona.edu/~rsims/ma464/standardnormaltable.pdf
+z_95 = 1.96
+
+default_percentiles = (1, 5, 25, 75, 95, 99)
+
+# All fields have the shape of the input without its last (iteration)
+# axis, except 'percentiles' which gets one trailing entry per requested
+# percentile. Entries without any samples are NaN (and n = 0).
+Summary = namedtuple('Summary', ['n', 'mean', 'variance', 'std', 'ci', 'median', 'percentiles'])
+
+# Number of real (non-NaN) samples along the last axis
+def sample_counts(samples):
+    return np.count_nonzero(~np.isnan(samples), axis = -1)
+
+# Linear-interpolated percentiles (like np.percentile's default method)
+# of already sorted, NaN-padded rows that hold 'n' real samples each
+def sorted_percentiles(sorted_samples, n, percentiles):
+    q = np.asarray(percentiles, dtype = float) / 100
+
+    # Position of each percentile within its row, shape (..., len(q))
+    pos = np.maximum(n[..., np.newaxis] - 1, 0) * q
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.ceil(pos).astype(np.intp)
+    frac = pos - lo
+
+    if sorted_samples.shape[-1] == 0:
+        return np.full(pos.shape, np.nan)
+
+    lo_values = np.take_along_axis(sorted_samples, lo, axis = -1)
+    hi_values = np.take_along_axis(sorted_samples, hi, axis = -1)
+    res = lo_values + (hi_values - lo_values) * frac
+
+    res[n == 0] = np.nan
+    return res
+
+# Sample statistics along the last axis of a NaN-padded array, e.g. a
+# (version x param x iteration) array holding a whole benchmark
+def summarize(samples, z = z_95, percentiles = default_percentiles):
+    samples = np.asarray(samples, dtype = float)
+    n = sample_counts(samples)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean = np.nansum(samples, axis = -1) / n
+        deviations = samples - mean[..., np.newaxis]
+        variance = np.nansum(deviations**2, axis = -1) / (n - 1)
+        variance = np.where(n > 1, variance, np.nan)
+        std = np.sqrt(variance)
+        ci = z * std / np.sqrt(n)
+
+    # NaN sorts last, so the first n entries of each row are the real samples
+    sorted_samples = np.sort(samples, axis = -1)
+
+    median = sorted_percentiles(sorted_samples, n, [50])[..., 0]
+    percentile_values = sorted_percentiles(sorted_samples, n, percentiles)
+
+    return Summary(
+        n = n,
+        mean = mean,
+        variance = variance,
+        std = std,
+        ci = ci,
+        median = median,
+        percentiles = percentile_values)
+
+## Warm-up detection
+
+# Iterations per batch in MSER-5
+mser_batch_size = 5
+
+# Never discard more than this fraction of a series
+mser_max_fraction = 0.5
+
+# Number of warm-up iterations to discard from each series along the
+# last axis, by the MSER-5 truncation rule: the samples are averaged in
+# batches of 5, and the number of leading batches d is chosen to minimize
+#
+#   sum over the kept batches of (batch mean - mean of kept batches)^2 / (kept batches)^2
+#
+# i.e. the (squared) standard error of the mean of what is kept.
+# (https://doi.org/10.1287/ijoc.1040.0112 for MSER-5)
+def mser_truncation(samples, batch_size = mser_batch_size, max_fraction = mser_max_fraction):
+    samples = np.asarray(samples, dtype = float)
+    batches = samples.shape[-1] // batch_size
+
+    batched = samples[..., :batches * batch_size].reshape(samples.shape[:-1] + (batches, batch_size))
+    means = batched.mean(axis = -1) # NaN for batches that run into the NaN padding
+
+    valid = ~np.isnan(means)
+    k = np.count_nonzero(valid, axis = -1)[..., np.newaxis]
+    x = np.where(valid, means, 0)
+
+    # Sums over batches d, d + 1, ... for every truncation point d
+    s = np.flip(np.cumsum(np.flip(x, axis = -1), axis = -1), axis = -1)
+    q = np.flip(np.cumsum(np.flip(x**2, axis = -1), axis = -1), axis = -1)
+
+    d = np.arange(batches)
+    kept = k - d
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mser = (q - s**2 / kept) / kept**2
+
+    allowed = (d <= max_fraction * k) & (kept > 1)
+    mser = np.where(allowed, mser, np.inf)
+
+    if batches == 0:
+        return np.zeros(samples.shape[:-1], dtype = np.intp)
+
+    return np.argmin(mser, axis = -1) * batch_size
+
+# Whether the MSER-5 'discards' of each series along the last axis are
+# as many as mser_truncation may discard (max_fraction of the series,
+# keeping at least two batches). The cap, not the data, then decided
+# where the warm-up ends, and it may well go on for longer.
+def mser_cap_reached(samples, discards, batch_size = mser_batch_size, max_fraction = mser_max_fraction):
+    samples = np.asarray(samples, dtype = float)
+    batches = samples.shape[-1] // batch_size
+
+    batched = samples[..., :batches * batch_size].reshape(samples.shape[:-1] + (batches, batch_size))
+    k = np.count_nonzero(~np.isnan(batched.mean(axis = -1)), axis = -1)
+
+    cap = np.minimum(np.floor(max_fraction * k), k - 2) * batch_size
+    return (k > 2) & (np.asarray(discards) >= cap)
+
+# Replace the first 'discards' samples of each series along the last
+# axis with NaN, so that the summary statistics ignore them
+def discard_leading(samples, discards):
+    samples = np.asarray(samples, dtype = float)
+    discards = np.asarray(discards)
+
+    iteration = np.arange(samples.shape[-1])
+    return np.where(iteration < discards[..., np.newaxis], np.nan, samples)
+
+## Sequential stopping
+
+# Stop once the CI half-width is within this fraction of the mean...
+target_relative_ci = 0.02
+
+# ...but never with fewer samples than this, and for series too noisy
+# to ever get there, never plan for more than this
+min_stopping_samples = 10
+max_stopping_samples = 1000
+
+# Move the real (non-NaN) samples of every row to the front, keeping
+# their order, e.g. after discard_leading() set the first ones to NaN
+def compact(samples):
+    order = np.argsort(np.isnan(samples), axis = -1, kind = 'stable')
+    return np.take_along_axis(samples, order, axis = -1)
+
+# For every series along the last axis: the number of samples after
+# which a sequential stopping rule would have stopped, i.e. the first
+# k >= min_samples at which z * s_k / sqrt(k) <= target * |mean_k|.
+# Returns (samples needed, whether the rule stopped within the series).
+# Series that never reach the target get the fixed-sample-size estimate
+# (z * s / (target * mean))^2 from all of their samples instead, capped
+# at max_samples.
+def stopping_samples(samples, target = target_relative_ci, z = z_95, min_samples = min_stopping_samples, max_samples = max_stopping_samples):
+    samples = compact(np.asarray(samples, dtype = float))
+    n = sample_counts(samples)
+    k = np.arange(1, samples.shape[-1] + 1)
+
+    # Running mean and variance from cumulative sums, shifted by the
+    # first sample to avoid cancellation
+    shift = samples[..., :1]
+    x = np.nan_to_num(samples - shift)
+    s1 = np.cumsum(x, axis = -1)
+    s2 = np.cumsum(x**2, axis = -1)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean = s1 / k + shift
+        variance = (s2 - s1**2 / k) / (k - 1)
+        half_width = z * np.sqrt(np.maximum(variance, 0)) / np.sqrt(k)
+
+        reached = (half_width <= target * np.abs(mean)) & (k >= min_samples) & (k <= n[..., np.newaxis])
+
+    stopped = reached.any(axis = -1)
+    first = np.argmax(reached, axis = -1) + 1
+
+    summary = summarize(samples, z = z)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        estimate = np.ceil((z * summary.std / (target * np.abs(summary.mean)))**2)
+    estimate = np.maximum(np.nan_to_num(estimate, nan = max_samples), np.maximum(n, min_samples))
+    estimate = np.minimum(estimate, max(max_samples, samples.shape[-1]))
+
+    return np.where(stopped, first, estimate).astype(np.int64), stopped
+
+## Comparisons
+
+# Quantile of Student's t distribution with 'df' degrees of freedom
+# (any shape), by the Cornish-Fisher expansion around the normal
+# quantile (Abramowitz & Stegun 26.7.5). Accurate to about 1e-4 from
+# df = 5 on, and Welch's df is far larger than that for our series.
+def t_quantile(p, df):
+    z = NormalDist().inv_cdf(p)
+    df = np.asarray(df, dtype = float)
+
+    return (z
+        + (z**3 + z) / (4 * df)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+        + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+# All fields have shape (a, b, ...) for a Summary whose fields have
+# shape (versions, ...): entry [i, j] compares version i with version j.
+#  diff, diff_ci:  mean_i - mean_j and the half-width of its Welch t-interval
+#  df:             Welch-Satterthwaite degrees of freedom
+#  speedup:        mean_i / mean_j, i.e. how many times faster j is than i,
+#  speedup_lower,  with its confidence interval (delta method on
+#  speedup_upper:  the log of the ratio, using the same t quantile)
+Comparison = namedtuple('Comparison', ['diff', 'diff_ci', 'df', 'speedup', 'speedup_lower', 'speedup_upper'])
+
+# Compare every pair of versions for every bench_param at once,
+# using the real sample counts of each series
+def welch_comparison(summary, confidence = 0.95):
+    mean_a, mean_b = summary.mean[:, np.newaxis], summary.mean[np.newaxis, :]
+    n_a, n_b = summary.n[:, np.newaxis], summary.n[np.newaxis, :]
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        # Squared standard errors of the two means
+        se2_a = summary.variance[:, np.newaxis] / n_a
+        se2_b = summary.variance[np.newaxis, :] / n_b
+
+        df = (se2_a + se2_b)**2 / (se2_a**2 / (n_a - 1) + se2_b**2 / (n_b - 1))
+        t = t_quantile(1 - (1 - confidence) / 2, df)
+
+        diff = mean_a - mean_b
+        diff_ci = t * np.sqrt(se2_a + se2_b)
+
+        speedup = mean_a / mean_b
+        log_ci = t * np.sqrt(se2_a / mean_a**2 + se2_b / mean_b**2)
+
+    return Comparison(
+        diff = diff,
+        diff_ci = diff_ci,
+        df = df,
+        speedup = speedup,
+        speedup_lower = speedup * np.exp(-log_ci),
+        speedup_upper = speedup * np.exp(log_ci))
+
+## Autocorrelation and block bootstrap
+
+# Longest lag the autocorrelation is estimated for
+max_autocorrelation_lag = 50
+
+# Resamples per series of the moving-block bootstrap
+bootstrap_resamples = 10000
+
+# Autocorrelation of every series along the last axis, for lags
+# 0..max_lag, as an array with one trailing entry per lag. Only the real
+# samples count (they are compacted first), and lags beyond a series'
+# length are NaN.
+def autocorrelation(samples, max_lag = max_autocorrelation_lag):
+    samples = compact(np.asarray(samples, dtype = float))
+    n = sample_counts(samples)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        deviations = samples - (np.nansum(samples, axis = -1) / n)[..., np.newaxis]
+        d = np.nan_to_num(deviations)
+        total = np.sum(d**2, axis = -1)
+
+        res = np.full(samples.shape[:-1] + (max_lag + 1,), np.nan)
+
+        for lag in range(min(max_lag, samples.shape[-1] - 1) + 1):
+            res[..., lag] = np.sum(d[..., :d.shape[-1] - lag] * d[..., lag:], axis = -1) / total
+
+    res[n[..., np.newaxis] <= np.arange(max_lag + 1)] = np.nan
+    return res
+
+# Integrated autocorrelation time tau = 1 + 2 * (rho_1 + ... + rho_K)
+# of every series, summing up to the first lag whose autocorrelation is
+# not positive (beyond it the estimates are mostly noise), and the
+# effective sample size n / tau: the number of independent samples the
+# series is worth. Returns (effective sample size, tau).
+def effective_sample_size(samples, max_lag = max_autocorrelation_lag):
+    n = sample_counts(np.asarray(samples, dtype = float))
+    rho = autocorrelation(samples, max_lag)[..., 1:]
+
+    positive = np.cumprod(np.nan_to_num(rho) > 0, axis = -1).astype(bool)
+    tau = 1 + 2 * np.sum(np.where(positive, rho, 0), axis = -1)
+
+    return np.clip(n / tau, np.minimum(n, 1), n), tau
+
+# Block length of the moving-block bootstrap of a series of n samples
+# with integrated autocorrelation time tau: n^(1/3), the usual rate for
+# estimating a mean, but at least tau, so that a block spans about as
+# many samples as it takes for them to become independent
+def block_length(n, tau):
+    return np.maximum(np.ceil(np.maximum(np.cbrt(n), tau)), 1).astype(np.intp)
+
+# Moving-block bootstrap of the mean and the median of every series
+# along the last axis. A resample concatenates ceil(n / b) blocks of b
+# consecutive samples, starting anywhere in the series, and is cut to
+# n samples, so that the autocorrelation within a block is kept.
+#
+# Resamples are never materialized: a resample is represented by how
+# many times it picked each sample, which gives its mean as a matrix
+# product and its median from the running count over the samples in
+# sorted order. Series of the same length and block length share these
+# counts, so each such group is resampled in one vectorized step.
+#
+# Returns (means, medians), each with one trailing entry per resample
+# (NaN for series without samples), and the block lengths used.
+def block_bootstrap(samples, resamples = bootstrap_resamples, seed = None):
+    samples = compact(np.asarray(samples, dtype = float))
+    rng = np.random.default_rng(seed)
+
+    n = sample_counts(samples)
+    _, tau = effective_sample_size(samples)
+    b = np.minimum(block_length(n, tau), np.maximum(n, 1))
+
+    rows = samples.reshape(-1, samples.shape[-1])
+    flat_n, flat_b = n.reshape(-1), b.reshape(-1)
+
+    means = np.full((len(rows), resamples), np.nan)
+    medians = np.full((len(rows), resamples), np.nan)
+
+    for (length, block) in sorted(set(zip(flat_n.tolist(), flat_b.tolist()))):
+        if length == 0:
+            continue
+
+        group = np.flatnonzero((flat_n == length) & (flat_b == block))
+
+        starts = rng.integers(0, length - block + 1, size = (resamples, -(-length // block)))
+        idx = (starts[..., np.newaxis] + np.arange(block)).reshape(resamples, -1)[:, :length]
+
+        # counts[r, i]: times resample r picked sample i
+        offsets = np.arange(resamples)[:, np.newaxis] * length
+        counts = np.bincount((offsets + idx).reshape(-1), minlength = resamples * length).reshape(resamples, length)
+
+        values = rows[group][:, :length]
+        means[group] = (counts @ values.T).T / length
+
+        # The median is the mean of the samples of rank (n + 1) // 2
+        # and n // 2 + 1, which are the same sample for odd n
+        for (g, row) in zip(group, values):
+            order = np.argsort(row)
+            ranks = np.cumsum(counts[:, order], axis = -1)
+
+            lower = row[order][np.argmax(ranks >= (length + 1) // 2, axis = -1)]
+            upper = row[order][np.argmax(ranks >= length // 2 + 1, axis = -1)]
+            medians[g] = (lower + upper) / 2
+
+    shape = samples.shape[:-1] + (resamples,)
+    return means.reshape(shape), medians.reshape(shape), b
+
+# Percentile interval of bootstrap resamples along the last axis
+def bootstrap_interval(resampled, confidence = 0.95):
+    alpha = (1 - confidence) / 2
+
+    lower, upper = np.percentile(resampled, [100 * alpha, 100 * (1 - alpha)], axis = -1)
+    return lower, upper
@@ -0,0 +1,260 @@
+import importlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+
+# Jobs only ever save to file, so no GUI backend is needed
+# (and none must be started in the worker processes)
+matplotlib.use('Agg')
+
+import logstore
+import plots
+
+## Settings
+
+# Number of worker processes, one figure is rendered per job
+workers = os.cpu_count()
+
+# Where incremental builds record what each output was built from
+manifest_filename = 'build-manifest.json'
+
+# A job is (module name, function name, arguments), so that it can
+# be sent to a worker process and printed as it finishes. A target
+# adds what the job reads (log files and the scripts themselves),
+# what it writes, and the settings that affect the result.
+Target = namedtuple('Target', ['job', 'inputs', 'outputs', 'settings'])
+
+# Module settings that change what the jobs render, as (module name,
+# setting) pairs. They are recorded with every output (see
+# target_record) and handed to the workers (see init_worker).
+plots_setting_names = [
+    ('plots', 'iterations_to_discard'),
+    ('plots', 'ci_method'),
+    ('benchstats', 'mser_batch_size'),
+    ('benchstats', 'mser_max_fraction'),
+    ('plots', 'benchmark_versions'),
+    ('plots', 'version_colors'),
+    ('plots', 'tail_percentiles'),
+    ('plots', 'histogram_bins'),
+    ('plots', 'bootstrap_seed'),
+    ('benchstats', 'bootstrap_resamples'),
+    ('benchstats', 'max_autocorrelation_lag')
+]
+
+memory_setting_names = [
+    ('memory-plots', 'dpi'),
+    ('memory-plots', 'benchmark_versions')
+]
+
+report_setting_names = [
+    ('report', 'tile_columns'),
+    ('plots', 'benchmark_versions'),
+    ('plots', 'version_colors')
+]
+
+# Current values of the settings, keyed by setting name
+def settings_of(setting_names):
+    return {name: getattr(importlib.import_module(module_name), name) for (module_name, name) in setting_names}
+
+def plots_settings():
+    return settings_of(plots_setting_names)
+
+def memory_settings():
+    return settings_of(memory_setting_names)
+
+# Workers started with 'spawn' (the default on macOS and Windows)
+# import the modules afresh, so the settings the parent changed at run
+# time are set again, as (module name, setting, value) triples. The
+# build's workers also keep every CPU busy already, so the bootstraps
+# of the tables (see plots.bootstrap_benchmarks) run in the worker
+# itself rather than each starting 'bootstrap_workers' more processes.
+def init_worker(settings):
+    for (module_name, name, value) in settings:
+        setattr(importlib.import_module(module_name), name, value)
+
+    plots.bootstrap_workers = 1
+
+def run_job(job):
+    module_name, function_name, args = job
+    getattr(importlib.import_module(module_name), function_name)(*args)
+    return job
+
+# The scripts count as inputs too, so that changing them rebuilds
+# what they render. Relative to the data directory we run from.
+def sources(names):
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.relpath(os.path.join(here, name)) for name in names]
+
+def job_key(job):
+    module_name, function_name, args = job
+    return module_name + '.' + function_name + repr(args)
+
+# One target per figure (or table file) of the report: the execution
+# time plot and the LaTeX tables of every benchmark, and the full and
+# every "zoomed in" memory plot of every benchmark version. With
+# 'html_report' set, the zoomable HTML report (see report.py) takes
+# the place of the "zoomed in" memory plots.
+def report_targets(benchmarks = None, tail_latencies = False, tables = False, html_report = False):
+    if benchmarks is None:
+        benchmarks = list(plots.benchmark_titles.keys())
+
+    targets = []
+
+    plots_sources = sources(['plots.py', 'benchstats.py', 'logstore.py', 'logparser.py'])
+    settings = plots_settings()
+
+    for benchmark in benchmarks:
+        logs = [plots.execution_time_filename(benchmark, version) for version in plots.benchmark_versions.keys()]
+
+        targets.append(Target(
+            job = ('plots', 'plot_benchmark', (benchmark, True)),
+            inputs = logs + plots_sources,
+            outputs = ['Execution-time-plots/' + benchmark + '.png'],
+            settings = settings))
+
+        if tail_latencies:
+            targets.append(Target(
+                job = ('plots', 'plot_benchmark', (benchmark, True, True)),
+                inputs = logs + plots_sources,
+                outputs = ['Execution-time-plots/' + benchmark + '_percentiles.png'],
+                settings = settings))
+
+            params, _ = plots.get_samples(benchmark)
+
+            targets.append(Target(
+                job = ('plots', 'plot_latency_histograms', (benchmark, True)),
+                inputs = logs + plots_sources,
+                outputs = ['Latency-histograms/' + benchmark + '/' + benchmark + '_' + str(param) + '.png' for param in params],
+                settings = settings))
+
+        if tables:
+            targets.append(Target(
+                job = ('plots', 'generate_comparison_tables_to_file', (benchmark,)),
+                inputs = logs + plots_sources,
+                outputs = ['Comparison-tables/' + benchmark + '.tex'],
+                settings = settings))
+
+    if tables:
+        targets.append(Target(
+            job = ('plots', 'export_comparisons', (benchmarks,)),
+            inputs = [plots.execution_time_filename(benchmark, version) for benchmark in benchmarks for version in plots.benchmark_versions.keys()] + plots_sources,
+            outputs = ['comparisons.csv', 'comparisons.json'],
+            settings = settings))
+
+    mp = plots.memory_plots()
+
+    memory_sources = sources(['memory-plots.py', 'decimate.py', 'logstore.py', 'logparser.py'])
+    settings = memory_settings()
+
+    for benchmark in benchmarks:
+        for version in mp.benchmark_versions.keys():
+            filename = mp.memory_filename(benchmark, version)
+
+            if not os.path.exists(filename):
+                print('-- Skipping', filename, '(no such log) --')
+                continue
+
+            # Also fills the parsed-log cache, so that workers
+            # rendering the same profile only ever read from it
+            profile = logstore.load_memory_profile(filename)
+
+            targets.append(Target(
+                job = ('memory-plots', 'plot_version_to_file', (benchmark, version, [], True)),
+                inputs = [filename] + memory_sources,
+                outputs = ['Memory-plots/' + benchmark + '/' + benchmark + version + '.png'],
+                settings = settings))
+
+            for pos in ([] if html_report else profile.positions):
+                if pos > 0:
+                    targets.append(Target(
+                        job = ('memory-plots', 'plot_version_to_file', (benchmark, version, [int(pos)], False)),
+                        inputs = [filename] + memory_sources,
+                        outputs = ['Memory-plots/' + benchmark + '/Zoomed/' + benchmark + version + str(pos) + '.png'],
+                        settings = settings))
+
+    if html_report:
+        report = importlib.import_module('report')
+
+        targets.append(Target(
+            job = ('report', 'write_report', (benchmarks,)),
+            inputs = [plots.execution_time_filename(benchmark, version) for benchmark in benchmarks for version in plots.benchmark_versions.keys()]
+                + [mp.memory_filename(benchmark, version) for benchmark in benchmarks for version in mp.benchmark_versions.keys() if os.path.exists(mp.memory_filename(benchmark, version))]
+                + sources(['report.py', 'decimate.py', 'logstore.py', 'logparser.py']),
+            outputs = [os.path.join(report.report_dir, report.report_filename)],
+            settings = settings_of(report_setting_names)))
+
+    return targets
+
+def load_manifest():
+    if not os.path.exists(manifest_filename):
+        return {}
+
+    with open(manifest_filename) as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp_filename = manifest_filename + '.tmp'
+
+    with open(tmp_filename, 'w') as f:
+        json.dump(manifest, f, indent = 1, sort_keys = True)
+
+    os.replace(tmp_filename, manifest_filename)
+
+# What a target's outputs are built from: the content hash of every
+# input and the settings. 'hashes' caches content hashes across
+# targets, as most inputs are shared by several of them.
+def target_record(target, hashes):
+    for filename in target.inputs:
+        if filename not in hashes:
+            hashes[filename] = logstore.content_hash(filename)
+
+    return {
+        'inputs': {filename: hashes[filename] for filename in target.inputs},
+        'settings': json.loads(json.dumps(target.settings, sort_keys = True))
+    }
+
+# A target is rebuilt if it was never built, if any input or setting
+# changed since, or if any of its outputs has gone missing
+def is_stale(target, record, manifest):
+    return (manifest.get(job_key(target.job)) != record
+        or not all([os.path.exists(output) for output in target.outputs]))
+
+# Render every figure of the report as an independent job in a pool
+# of 'workers' processes. With 'incremental' set, only the figures
+# whose inputs or settings changed since the last build are rendered.
+def parallel_build(benchmarks = None, tail_latencies = False, tables = False, workers = workers, incremental = False, html_report = False):
+    targets = report_targets(benchmarks, tail_latencies, tables, html_report)
+
+    manifest = load_manifest()
+    hashes = {}
+    records = {}
+    stale = []
+
+    for target in targets:
+        key = job_key(target.job)
+        records[key] = target_record(target, hashes)
+
+        if (not incremental) or is_stale(target, records[key], manifest):
+            stale.append(target)
+
+    print('\n-- Rendering', len(stale), 'of', len(targets), 'outputs with', workers, 'worker(s) --\n')
+
+    settings = [(module_name, name, getattr(importlib.import_module(module_name), name)) for (module_name, name) in plots_setting_names + memory_setting_names + report_setting_names]
+
+    with ProcessPoolExecutor(max_workers = workers, initializer = init_worker, initargs = (settings,)) as pool:
+        for job in pool.map(run_job, [target.job for target in stale]):
+            print('Done:', job_key(job))
+
+            # Saved after every job so that an interrupted
+            # build does not redo what it already finished
+            manifest[job_key(job)] = records[job_key(job)]
+            save_manifest(manifest)
+
+# Only re-render the outputs whose inputs or settings changed
+def incremental_build(benchmarks = None, tail_latencies = False, tables = True, workers = workers, html_report = False):
+    parallel_build(benchmarks, tail_latencies, tables, workers, incremental = True, html_report = html_report)
+
+if __name__ == '__main__':
+    incremental_build()
@@ -0,0 +1,29 @@
+import numpy as np
+
+# Indices of the samples to draw so that a series of any length renders
+# like the full series at a width of 'columns' pixels: for every column,
+# the smallest and the largest sample that fall into it, in the order
+# they occur. Peaks (and dips) are therefore kept exactly, and the number
+# of points drawn never exceeds 2 * columns + 2 however long the series is.
+def minmax_indices(y_values, columns):
+    n = len(y_values)
+
+    if n <= 2 * columns:
+        return np.arange(n)
+
+    # First sample of each column, and the column of every sample
+    starts = np.linspace(0, n, columns, endpoint = False).astype(np.intp)
+    column_of = np.repeat(np.arange(columns), np.diff(np.append(starts, n)))
+
+    idx = np.arange(n)
+    mins = np.minimum.reduceat(y_values, starts)
+    maxs = np.maximum.reduceat(y_values, starts)
+
+    # Position of (the last occurrence of) the min and max in each column
+    i_min = np.maximum.reduceat(np.where(y_values == mins[column_of], idx, -1), starts)
+    i_max = np.maximum.reduceat(np.where(y_values == maxs[column_of], idx, -1), starts)
+
+    # Keep the end points so the series spans the same x range
+    res = np.concatenate(([0], np.minimum(i_min, i_max), np.maximum(i_min, i_max), [n - 1]))
+
+    return np.unique(res)
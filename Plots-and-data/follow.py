@@ -0,0 +1,229 @@
+import os
+import numpy as np
+import benchstats
+import decimate
+import logparser
+import plots
+
+## Settings
+
+# Seconds between checks for newly appended lines
+poll_interval = 1.0
+
+# Number of memory samples kept (and drawn), 10 minutes at 60 FPS
+memory_capacity = 60 * 60 * 10
+
+# Fixed-size buffer keeping the last 'capacity' values appended to it
+class RingBuffer:
+
+    def __init__(self, capacity, dtype = float):
+        self.data = np.zeros(capacity, dtype = dtype)
+        self.count = 0 # Total number of values ever appended
+
+    def extend(self, values):
+        capacity = len(self.data)
+        values = np.asarray(values, dtype = self.data.dtype)
+
+        # Values that would be overwritten within this call are skipped
+        skipped = max(len(values) - capacity, 0)
+        values = values[skipped:]
+        self.count += skipped
+
+        start = self.count % capacity
+        first = min(len(values), capacity - start)
+        self.data[start:start + first] = values[:first]
+        self.data[:len(values) - first] = values[first:]
+
+        self.count += len(values)
+
+    # Index (counted over everything ever appended) of the oldest value kept
+    def start(self):
+        return max(self.count - len(self.data), 0)
+
+    # Kept values, oldest first
+    def values(self):
+        capacity = len(self.data)
+
+        if self.count <= capacity:
+            return self.data[:self.count]
+
+        return np.roll(self.data, -(self.count % capacity))
+
+# Follows a growing BenchApp log (execution time or memory consumption):
+# every poll() parses only the lines appended since the previous one
+# and updates the per-bench_param runtimes and the memory series
+class LogFollower:
+
+    def __init__(self, filename, capacity = memory_capacity):
+        self.filename = filename
+        self.capacity = capacity
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.partial_line = b''
+
+        self.benchmark = None
+        self.params = []
+        self.means = []
+        self.cis = []
+        self.current_samples = []
+
+        self.memory = RingBuffer(self.capacity)
+        self.timestamps = RingBuffer(self.capacity, dtype = np.int64)
+        self.first_timestamp = None # Of the first sample ever, time 0 on the plot
+        self.memory_positions = [] # Sample index of each 'Running ...' header
+
+        self.done = False
+
+    # Complete lines appended since the last call. A line still being
+    # written (no trailing newline yet) is kept for the next call.
+    def read_new_lines(self):
+        if not os.path.exists(self.filename):
+            return []
+
+        # The log was truncated or replaced, start over
+        if os.path.getsize(self.filename) < self.offset:
+            self.reset()
+
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+
+        self.offset += len(data)
+
+        *lines, self.partial_line = (self.partial_line + data).split(b'\n')
+
+        # BenchApp does not end its logs with a newline, so the
+        # last line would otherwise never count as complete
+        if self.partial_line.startswith(b'Benchmark done'):
+            lines.append(self.partial_line)
+            self.partial_line = b''
+
+        return [line.decode('utf-8', errors = 'replace') for line in lines]
+
+    # Parse new lines, returning whether anything changed
+    def poll(self):
+        lines = self.read_new_lines()
+        mb = []
+        timestamps = []
+
+        for record in logparser.parse_lines(lines):
+
+            if isinstance(record, logparser.MemorySample):
+                mb.append(record.mb)
+                timestamps.append(record.timestamp)
+
+            elif isinstance(record, logparser.Sample):
+                self.current_samples.append(record.seconds)
+
+            elif isinstance(record, logparser.RunHeader):
+                self.benchmark = record.benchmark
+                self.params.append(record.param)
+                self.current_samples = []
+                self.memory_positions.append(self.memory.count + len(mb))
+
+            elif isinstance(record, logparser.Average):
+                summary = benchstats.summarize(plots.discard_warmup(self.current_samples)[0])
+                self.means.append(float(summary.mean))
+                self.cis.append(float(summary.ci))
+                self.current_samples = []
+
+            elif isinstance(record, logparser.BenchmarkDone):
+                self.done = True
+
+        if self.first_timestamp is None and len(timestamps) > 0:
+            self.first_timestamp = timestamps[0]
+
+        self.memory.extend(mb)
+        self.timestamps.extend(timestamps)
+
+        return len(lines) > 0
+
+# Draw (or redraw) the runtime and memory panels in place
+def update_figure(follower, runtime_ax, memory_ax, artists):
+    for artist in artists:
+        artist.remove()
+    artists.clear()
+
+    # Runtime: mean and confidence interval of every finished
+    # bench_param, plus the running mean of the one in progress
+    finished = len(follower.means)
+
+    if finished > 0:
+        x_values = follower.params[:finished]
+        means = np.array(follower.means)
+        cis = np.array(follower.cis)
+
+        artists += runtime_ax.plot(x_values, means, color = plots.c_SC_opt_none, marker = '.', markersize = 7, linewidth = .5)
+        artists.append(runtime_ax.fill_between(x_values, means - cis, means + cis, color = plots.c_SC_opt_none, alpha = .1))
+
+    if len(follower.current_samples) > 0 and len(follower.params) > finished:
+        artists += runtime_ax.plot(
+            [follower.params[-1]], [np.mean(follower.current_samples)],
+            color = plots.c_GCD_opt_speed, marker = 'o', fillstyle = 'none',
+            label = 'In progress (' + str(len(follower.current_samples)) + ' iterations)')
+        artists.append(runtime_ax.legend())
+
+    if follower.benchmark in plots.benchmark_xlabels:
+        runtime_ax.set_xlabel(plots.benchmark_xlabels[follower.benchmark])
+    runtime_ax.set_ylabel('Runtime (seconds)')
+    runtime_ax.relim()
+    runtime_ax.autoscale_view()
+
+    # Memory: the last 'memory_capacity' samples, decimated per pixel
+    # column, at their times since the first sample of the log (spread
+    # within each second as in logparser.sample_seconds)
+    y_values = follower.memory.values()
+
+    if len(y_values) > 0:
+        timestamps = follower.timestamps.values()
+        seconds = logparser.sample_seconds(timestamps) + (timestamps[0] - follower.first_timestamp)
+
+        columns = int(memory_ax.figure.get_figwidth() * memory_ax.figure.dpi)
+        t = decimate.minmax_indices(y_values, columns)
+        x_values = seconds[t]
+
+        artists += memory_ax.plot(x_values, y_values[t], color = '#2b60c0', linewidth = .5)
+        artists.append(memory_ax.fill_between(x_values, y_values[t], color = '#74a2f8', alpha = 0.5))
+
+        # A header after the last sample is drawn at that sample until
+        # the next one arrives
+        for pos in follower.memory_positions:
+            if pos >= follower.memory.start():
+                artists.append(memory_ax.axvline(seconds[min(pos - follower.memory.start(), len(seconds) - 1)]))
+
+        memory_ax.set_xlim([x_values[0], max(x_values[-1], x_values[0] + 1)])
+        memory_ax.set_ylim([0, y_values.max() * 1.05])
+
+    memory_ax.set_xlabel('Time (seconds)')
+    memory_ax.set_ylabel('Memory (Mb)')
+
+    title = os.path.basename(follower.filename) + (' (done)' if follower.done else ' (running)')
+    runtime_ax.set_title(title)
+
+# Tail a BenchApp log while the benchmark is running, updating the
+# runtime and memory panels every 'interval' seconds until the log
+# says 'Benchmark done' (or the window is closed)
+def follow(filename, interval = poll_interval, capacity = memory_capacity):
+    follower = LogFollower(filename, capacity)
+
+    plt = plots.pyplot()
+    plt.ion()
+    fig, (runtime_ax, memory_ax) = plt.subplots(2, 1, figsize = (10, 8))
+    artists = []
+
+    while plt.fignum_exists(fig.number):
+        if follower.poll():
+            update_figure(follower, runtime_ax, memory_ax, artists)
+            fig.canvas.draw_idle()
+
+        if follower.done:
+            break
+
+        plt.pause(interval)
+
+    plt.ioff()
+    plt.show()
+
+#follow('Official-memory-consumption-profile/SpawnManyWaiting/SpawnManyWaiting_SC_opt_speed')
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+# A Python stand-in for BenchApp: runs the six benchmarks under asyncio,
+# a ThreadPoolExecutor and a ProcessPoolExecutor, and writes execution
+# time logs and memory consumption profiles in BenchApp's format, so
+# that the rest of the scripts (logparser, plots.plot_file,
+# memory-plots.plot_file, ...) read them as they are.
+#
+# E.g. 'python harness.py Fibonacci --mode asyncio --iterations 20'
+# writes 'Python-execution-time/Fibonacci/Fibonacci_py_asyncio' and
+# 'Python-memory-consumption-profile/Fibonacci/Fibonacci_py_asyncio'.
+
+## Settings
+
+# Iterations per bench_param, of which BenchApp averages all but the
+# first 'discarded_iterations' in its 'Done in an average of' line
+iterations = 110
+discarded_iterations = 10
+
+# The same bench_params as BenchApp
+benchmark_params = {
+    'SpawnManyWaiting': [2, 4, 6, 8, 10],
+    'SpawnManyWaitingGroup': [50, 100, 150, 200, 250, 300],
+    'SpawnManyActors': [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000],
+    'Fibonacci': [5, 10, 15, 20, 25],
+    'NQueens': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
+    'MatrixMultiplication': [25, 50, 75, 100]
+}
+
+# Mode -> (name in 'About to run ...', method in 'Running ...', tag in 'Done' lines)
+modes = {
+    'asyncio': ('asyncio', 'runAsyncio', 'asyncio'),
+    'threads': ('ThreadPoolExecutor', 'runThreads', 'threads'),
+    'processes': ('ProcessPoolExecutor', 'runProcesses', 'processes')
+}
+
+# Version suffix of the log file names, e.g. 'Fibonacci_py_asyncio'
+python_versions = {
+    '_py_asyncio': 'Python (asyncio)',
+    '_py_threads': 'Python (threads)',
+    '_py_processes': 'Python (processes)'
+}
+
+execution_time_dir = 'Python-execution-time'
+memory_profile_dir = 'Python-memory-consumption-profile'
+
+# How long every spawned task waits in SpawnManyWaiting(Group)
+wait_seconds = 0.1
+
+# Fibonacci spawns a task for each of the two recursive calls this many
+# levels deep, and recurses sequentially below that
+fibonacci_spawn_depth = 4
+
+# Memory samples per second, like BenchApp's 'Max FPS is 60 FPS'
+sample_rate = 60
+
+## Workloads
+#
+# Every workload exists as plain functions (run in worker threads or
+# processes) and as coroutines (run as asyncio tasks). They are kept at
+# module level so that the process pool can pickle them.
+
+def wait_a_while():
+    time.sleep(wait_seconds)
+
+async def wait_a_while_async():
+    await asyncio.sleep(wait_seconds)
+
+def fibonacci(n):
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+async def fibonacci_async(n, depth = 0):
+    if n < 2 or depth >= fibonacci_spawn_depth:
+        return fibonacci(n)
+
+    a = asyncio.create_task(fibonacci_async(n - 1, depth + 1))
+    b = asyncio.create_task(fibonacci_async(n - 2, depth + 1))
+    return await a + await b
+
+# The bench_params of fib(n) at 'depth' levels of the recursion tree,
+# i.e. the independent pieces of work spawned by the pool versions
+def fibonacci_leaves(n, depth = 0):
+    if n < 2 or depth >= fibonacci_spawn_depth:
+        return [n]
+
+    return fibonacci_leaves(n - 1, depth + 1) + fibonacci_leaves(n - 2, depth + 1)
+
+# Number of ways to place the remaining queens, given the columns
+# of the queens already placed in the first rows
+def queens_solutions(n, columns):
+    row = len(columns)
+
+    if row == n:
+        return 1
+
+    count = 0
+    for column in range(n):
+        if all([c != column and abs(c - column) != row - r for (r, c) in enumerate(columns)]):
+            count += queens_solutions(n, columns + [column])
+
+    return count
+
+async def queens_solutions_async(n, columns):
+    return queens_solutions(n, columns)
+
+def random_matrix(n, seed):
+    rng = random.Random(seed)
+    return [[rng.random() for _ in range(n)] for _ in range(n)]
+
+# One row of the product a * b
+def matrix_row(row, b):
+    columns = list(zip(*b))
+    return [sum([x * y for (x, y) in zip(row, column)]) for column in columns]
+
+async def matrix_row_async(row, b):
+    return matrix_row(row, b)
+
+# An actor: state that only its own messages touch, one at a time
+class Counter:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def increment(self):
+        with self.lock:
+            self.value += 1
+            return self.value
+
+class AsyncCounter:
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.value = 0
+
+    async def increment(self):
+        async with self.lock:
+            self.value += 1
+            return self.value
+
+def spawn_counter():
+    return Counter().increment()
+
+## One iteration of every benchmark, per mode
+
+async def run_async(benchmark, n):
+    if benchmark == 'SpawnManyWaiting':
+        for _ in range(n):
+            await asyncio.create_task(wait_a_while_async())
+
+    elif benchmark == 'SpawnManyWaitingGroup':
+        await asyncio.gather(*[wait_a_while_async() for _ in range(n)])
+
+    elif benchmark == 'SpawnManyActors':
+        actors = [AsyncCounter() for _ in range(n)]
+        await asyncio.gather(*[actor.increment() for actor in actors])
+
+    elif benchmark == 'Fibonacci':
+        await fibonacci_async(n)
+
+    elif benchmark == 'NQueens':
+        await asyncio.gather(*[queens_solutions_async(n, [column]) for column in range(n)])
+
+    elif benchmark == 'MatrixMultiplication':
+        a, b = random_matrix(n, 1), random_matrix(n, 2)
+        await asyncio.gather(*[matrix_row_async(row, b) for row in a])
+
+def run_in_pool(pool, benchmark, n):
+    if benchmark == 'SpawnManyWaiting':
+        for _ in range(n):
+            pool.submit(wait_a_while).result()
+
+    elif benchmark == 'SpawnManyWaitingGroup':
+        wait([pool.submit(wait_a_while) for _ in range(n)])
+
+    elif benchmark == 'SpawnManyActors':
+        if isinstance(pool, ThreadPoolExecutor):
+            actors = [Counter() for _ in range(n)]
+            wait([pool.submit(actor.increment) for actor in actors])
+        else:
+            wait([pool.submit(spawn_counter) for _ in range(n)])
+
+    elif benchmark == 'Fibonacci':
+        sum([future.result() for future in [pool.submit(fibonacci, leaf) for leaf in fibonacci_leaves(n)]])
+
+    elif benchmark == 'NQueens':
+        wait([pool.submit(queens_solutions, n, [column]) for column in range(n)])
+
+    elif benchmark == 'MatrixMultiplication':
+        a, b = random_matrix(n, 1), random_matrix(n, 2)
+        wait([pool.submit(matrix_row, row, b) for row in a])
+
+## Memory sampling
+
+# Resident set size of this process and all of its descendants, in Mb.
+# Outside Linux (no /proc) only the peak RSS of this process is known.
+def rss_mb():
+    if not os.path.exists('/proc/self/status'):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+    total_kb = 0
+    pids = [os.getpid()]
+
+    while pids:
+        pid = pids.pop()
+
+        try:
+            with open('/proc/' + str(pid) + '/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+
+            for task in os.listdir('/proc/' + str(pid) + '/task'):
+                with open('/proc/' + str(pid) + '/task/' + task + '/children') as f:
+                    pids += [int(child) for child in f.read().split()]
+
+        # The process exited while we were looking
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+
+    return total_kb / 1024
+
+# Appends lines to a log from several threads, one whole line at a time
+class LogWriter:
+
+    def __init__(self, filename):
+        os.makedirs(os.path.dirname(filename), exist_ok = True)
+        self.file = open(filename, 'w')
+        self.lock = threading.Lock()
+
+    def write(self, *lines):
+        with self.lock:
+            for line in lines:
+                self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self, last_line):
+        with self.lock:
+            self.file.write(last_line)
+            self.file.close()
+
+# Writes a 'mem:' line 'sample_rate' times per second until stopped
+class MemorySampler(threading.Thread):
+
+    def __init__(self, log, rate = sample_rate):
+        super().__init__(daemon = True)
+        self.log = log
+        self.interval = 1 / rate
+        self.stopped = threading.Event()
+
+    def run(self):
+        next_time = time.perf_counter()
+
+        while not self.stopped.is_set():
+            stamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S +0000')
+            self.log.write(stamp + ', mem: ' + repr(rss_mb()))
+
+            # Like a display link, a late sample is dropped, not made up for
+            next_time = max(next_time + self.interval, time.perf_counter())
+            self.stopped.wait(next_time - time.perf_counter())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+## Log format
+
+# 'N' as BenchApp writes it in 'Running ...' headers and in 'Done' lines
+def param_texts(benchmark, n):
+    if benchmark in ['SpawnManyWaiting', 'SpawnManyWaitingGroup']:
+        return str(n) + ' task(s)', str(n) + ' tasks'
+    elif benchmark == 'SpawnManyActors':
+        return str(n) + ' actor(s)', str(n) + ' actors'
+    elif benchmark == 'Fibonacci':
+        return 'fib(' + str(n) + ')', 'fib(' + str(n) + ')'
+    elif benchmark == 'NQueens':
+        return str(n) + ' queen(s)', str(n) + ' queens'
+    elif benchmark == 'MatrixMultiplication':
+        return '(' + str(n) + 'x' + str(n) + ') matrix', '(' + str(n) + 'x' + str(n) + ') matrix'
+
+# With 'workers' set, the worker count is a run dimension of the log
+# (see logparser.read_run_dimensions), so runs with different counts
+# get logs of their own: 'Fibonacci_py_threads@workers=4'
+def log_filename(directory, benchmark, mode, workers = None):
+    filename = os.path.join(directory, benchmark, benchmark + '_py_' + mode)
+    return filename if workers is None else filename + '@workers=' + str(workers)
+
+# Run every bench_param of a benchmark in one mode, writing an execution
+# time log (one line per iteration and the average of all but the first
+# 'discarded_iterations') or, with 'memory' set, a memory consumption
+# profile (the 'mem:' lines of the sampler and a 'Done.' line per
+# bench_param) instead. 'workers' is the size of the thread or process
+# pool (the executor's default if None); asyncio always runs on one thread.
+def run_benchmark(benchmark, mode, params = None, iterations = iterations, memory = False, output_dir = '.', workers = None):
+    if params is None:
+        params = benchmark_params[benchmark]
+
+    name, method, tag = modes[mode]
+    directory = os.path.join(output_dir, memory_profile_dir if memory else execution_time_dir)
+    filename = log_filename(directory, benchmark, mode, workers)
+    log = LogWriter(filename)
+
+    log.write("Pressed 'Run benchmark'")
+
+    if workers is not None:
+        log.write('Workers: ' + str(workers))
+
+    if memory:
+        log.write('Starting memory measurement. Max FPS is ' + str(sample_rate) + ' FPS.')
+        sampler = MemorySampler(log)
+        sampler.start()
+
+    log.write("About to run '" + name + "'-version of " + benchmark + ' with batch mode: true')
+
+    loop = asyncio.new_event_loop() if mode == 'asyncio' else None
+    pool = {'threads': ThreadPoolExecutor, 'processes': ProcessPoolExecutor}[mode](max_workers = workers) if mode != 'asyncio' else None
+
+    try:
+        for n in params:
+            header_text, done_text = param_texts(benchmark, n)
+            log.write('Running BenchApp.' + benchmark + ':' + method + ' with ' + header_text + ' and ' + str(iterations) + ' iteration(s).', '')
+
+            seconds = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+
+                if loop is not None:
+                    loop.run_until_complete(run_async(benchmark, n))
+                else:
+                    run_in_pool(pool, benchmark, n)
+
+                seconds.append(time.perf_counter() - start)
+
+                if not memory:
+                    log.write(repr(seconds[-1]))
+
+            if memory:
+                log.write('', '(' + tag + ', ' + done_text + ') Done.', '')
+            else:
+                kept = seconds[discarded_iterations:] or seconds
+                average = sum(kept) / len(kept)
+                log.write('', '(' + tag + ', average, ' + done_text + ') Done in an average of ' + repr(average) + ' seconds.', '')
+
+            print(benchmark, mode, 'N =', n, 'done', file = sys.stderr)
+    finally:
+        if memory:
+            sampler.stop()
+        if loop is not None:
+            loop.close()
+        if pool is not None:
+            pool.shutdown()
+
+    # BenchApp ends memory profiles without a newline
+    log.close('Benchmark done' if memory else 'Benchmark done\n')
+
+    return filename
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Python stand-in for BenchApp, writing logs in its format')
+    parser.add_argument('benchmarks', nargs = '*', default = list(benchmark_params.keys()))
+    parser.add_argument('--mode', choices = list(modes.keys()), action = 'append', help = 'default: all three')
+    parser.add_argument('--params', type = int, nargs = '+', help = "default: BenchApp's bench_params")
+    parser.add_argument('--iterations', type = int, default = iterations)
+    parser.add_argument('--no-memory', action = 'store_true', help = 'only write execution time logs')
+    parser.add_argument('--output-dir', default = '.')
+    parser.add_argument('--workers', type = int, nargs = '+', help = 'pool sizes to run with, one log each (default: the executor default)')
+
+    args = parser.parse_args(argv)
+
+    for benchmark in args.benchmarks:
+        for mode in args.mode or list(modes.keys()):
+            for workers in args.workers or [None]:
+                print(run_benchmark(benchmark, mode, args.params, args.iterations, False, args.output_dir, workers))
+
+                if not args.no_memory:
+                    print(run_benchmark(benchmark, mode, args.params, args.iterations, True, args.output_dir, workers))
+
+if __name__ == '__main__':
+    main()
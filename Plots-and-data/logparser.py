@@ -0,0 +1,246 @@
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+
+## Records yielded by parse_lines() / parse_log()
+
+# 'Running BenchApp.Fibonacci:runGCD with fib(5) and 110 iteration(s).'
+# --> RunHeader('Fibonacci', 'runGCD', 5, 110)
+RunHeader = namedtuple('RunHeader', ['benchmark', 'method', 'param', 'iterations'])
+
+# '0.00024645833764225245' (the time one benchmark iteration took)
+Sample = namedtuple('Sample', ['seconds'])
+
+# '(async, average, fib(10) Done in an average of 0.0003172687534242868 seconds.'
+Average = namedtuple('Average', ['seconds'])
+
+# '2022-06-06 18:29:51 +0000, mem: 14.79827880859375'
+# --> MemorySample(1654540191, 14.79827880859375)
+MemorySample = namedtuple('MemorySample', ['timestamp', 'mb'])
+
+# '(GCD, fib(5)) Done.' --> Done('GCD')
+Done = namedtuple('Done', ['mode'])
+
+# 'Benchmark done'
+BenchmarkDone = namedtuple('BenchmarkDone', [])
+
+# 'Cores: 8' --> RunDimension('cores', '8'), a property of the whole run
+# (e.g. the core count or device model) written before the first header
+RunDimension = namedtuple('RunDimension', ['key', 'value'])
+
+## Precompiled patterns
+
+# The parameter is the first number after 'with', which also covers
+# the '(25x25) matrix' case of MatrixMultiplication
+header_pattern = re.compile(r'Running BenchApp\.(\w+):(\w+) with \D*(\d+).* and (\d+) iteration')
+average_pattern = re.compile(r'average of (\d+\.?\d*(?:e-?\d+)?) seconds')
+memory_pattern = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d [+-]\d{4}), mem: (\d+\.?\d*(?:e-?\d+)?)')
+done_pattern = re.compile(r'\((\w+), .*\) Done\.')
+sample_pattern = re.compile(r'\d+\.?\d*(?:e-?\d+)?\s*$')
+dimension_pattern = re.compile(r'(Cores|Threads|Workers|Device): (.+?)\s*$')
+
+# Turn lines of a BenchApp log (execution time or memory consumption)
+# into a stream of records. Lines that carry no data, e.g.
+# "Pressed 'Run benchmark'", are skipped.
+def parse_lines(lines):
+
+    # The sampler prints many 'mem:' lines per second, so we only
+    # parse a timestamp string when it differs from the previous one
+    last_stamp = None
+    last_epoch = 0
+
+    for line in lines:
+
+        # Checked first since memory samples make up almost
+        # all lines of a memory consumption profile
+        match = memory_pattern.match(line)
+        if match:
+            stamp = match.group(1)
+            if stamp != last_stamp:
+                last_stamp = stamp
+                last_epoch = int(datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S %z').timestamp())
+            yield MemorySample(last_epoch, float(match.group(2)))
+            continue
+
+        if sample_pattern.match(line):
+            yield Sample(float(line))
+            continue
+
+        if line.startswith('Running'):
+            benchmark, method, param, iterations = header_pattern.match(line).groups()
+            yield RunHeader(benchmark, method, int(param), int(iterations))
+            continue
+
+        match = average_pattern.search(line)
+        if match:
+            yield Average(float(match.group(1)))
+            continue
+
+        match = done_pattern.match(line)
+        if match:
+            yield Done(match.group(1))
+            continue
+
+        match = dimension_pattern.match(line)
+        if match:
+            yield RunDimension(match.group(1).lower(), match.group(2))
+            continue
+
+        if line.startswith('Benchmark done'):
+            yield BenchmarkDone()
+
+# Stream the records of a log file, one line at a time
+def parse_log(filename):
+    with open(filename) as f:
+        yield from parse_lines(f)
+
+# The run dimensions of a log, e.g. {'cores': '8', 'device': 'iPhone 12'},
+# from 'Key: value' lines before its first 'Running ...' header, and from
+# '@key=value' tags at the end of its file name, which take precedence:
+# 'Fibonacci_GCD_opt_none@cores=8' --> {'cores': '8'}
+def read_run_dimensions(filename):
+    dimensions = {}
+
+    with open(filename) as f:
+        for line in f:
+            if line.startswith('Running'):
+                break
+
+            match = dimension_pattern.match(line)
+            if match:
+                dimensions[match.group(1).lower()] = match.group(2)
+
+    for tag in os.path.basename(filename).split('@')[1:]:
+        key, _, value = tag.partition('=')
+        dimensions[key.lower()] = value
+
+    return dimensions
+
+## Collecting records into NumPy arrays
+
+# 'samples' is a (param x iteration) array of per-iteration times,
+# padded with NaN should a run have fewer iterations than the others
+ExecutionTimeLog = namedtuple('ExecutionTimeLog', ['benchmark', 'params', 'iterations', 'samples', 'averages'])
+
+# 'positions' and 'done_positions' are indices into 'mb' at which each
+# 'Running ...' header and '(..., ...) Done.' marker appeared. 'seconds'
+# is the time of every sample since the first one (see sample_seconds).
+MemoryProfile = namedtuple('MemoryProfile', ['benchmark', 'params', 'positions', 'done_positions', 'timestamps', 'seconds', 'mb'])
+
+# Build a (rows x longest row) array, padding short rows with NaN
+def padded_array(rows):
+    width = max([len(row) for row in rows], default = 0)
+    res = np.full((len(rows), width), np.nan)
+
+    for (i, row) in enumerate(rows):
+        res[i, :len(row)] = row
+
+    return res
+
+# First index and length of every run of equal timestamps, i.e. of the
+# samples that fall into each one second bucket
+def second_buckets(timestamps):
+    n = len(timestamps)
+    starts = np.flatnonzero(np.concatenate(([True], timestamps[1:] != timestamps[:-1])))
+    counts = np.diff(np.append(starts, n))
+    return starts, counts
+
+# Time of every memory sample in seconds since the first one. The log
+# timestamps only have a resolution of a second, so the samples within
+# each second are spread evenly across it. The first and the last
+# second are usually cut short by the start and end of the measurement,
+# so their samples are spaced at the rate of the full seconds instead,
+# ending at the end of the first second and starting at the start of
+# the last one respectively.
+def sample_seconds(timestamps):
+    timestamps = np.asarray(timestamps, dtype = np.int64)
+    n = len(timestamps)
+
+    if n == 0:
+        return np.zeros(0)
+
+    starts, counts = second_buckets(timestamps)
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    index = np.arange(n) - starts[bucket]
+
+    # Samples per second of the full (interior) seconds
+    rate = np.median(counts[1:-1]) if len(counts) > 2 else counts.max()
+
+    frac = index / counts[bucket]
+
+    last = bucket == len(starts) - 1
+    frac[last] = index[last] / max(rate, counts[-1])
+
+    if len(starts) > 1:
+        first = bucket == 0
+        frac[first] = 1 - (counts[0] - index[first]) / max(rate, counts[0])
+
+    seconds = (timestamps - timestamps[0]) + frac
+    return seconds - seconds[0]
+
+def read_execution_time_log(filename):
+    benchmark = None
+    params = []
+    iterations = []
+    samples = []
+    averages = []
+
+    for record in parse_log(filename):
+
+        if isinstance(record, Sample):
+            samples[-1].append(record.seconds)
+
+        elif isinstance(record, RunHeader):
+            benchmark = record.benchmark
+            params.append(record.param)
+            iterations.append(record.iterations)
+            samples.append([])
+
+        elif isinstance(record, Average):
+            averages.append(record.seconds)
+
+        elif isinstance(record, BenchmarkDone):
+            break
+
+    return ExecutionTimeLog(
+        benchmark = benchmark,
+        params = np.array(params, dtype = np.int32),
+        iterations = np.array(iterations, dtype = np.int32),
+        samples = padded_array(samples),
+        averages = np.array(averages))
+
+def read_memory_profile(filename):
+    benchmark = None
+    params = []
+    positions = []
+    done_positions = []
+    timestamps = []
+    mb = []
+
+    for record in parse_log(filename):
+
+        if isinstance(record, MemorySample):
+            timestamps.append(record.timestamp)
+            mb.append(record.mb)
+
+        elif isinstance(record, RunHeader):
+            benchmark = record.benchmark
+            params.append(record.param)
+            positions.append(len(mb))
+
+        elif isinstance(record, Done):
+            done_positions.append(len(mb))
+
+        elif isinstance(record, BenchmarkDone):
+            break
+
+    return MemoryProfile(
+        benchmark = benchmark,
+        params = np.array(params, dtype = np.int32),
+        positions = np.array(positions, dtype = np.int64),
+        done_positions = np.array(done_positions, dtype = np.int64),
+        timestamps = np.array(timestamps, dtype = np.int64),
+        seconds = sample_seconds(timestamps),
+        mb = np.array(mb))
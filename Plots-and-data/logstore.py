@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import numpy as np
+import logparser
+
+## Settings
+cache_dir = 'Parsed-data'
+
+# Bump when the layout or the parser output changes, so that
+# stale cache files are re-parsed instead of misread
+format_version = 2
+
+# Column name -> dtype for the two kinds of logs
+execution_time_columns = {
+    'params': np.int32,
+    'iterations': np.int32,
+    'samples': np.float64,
+    'averages': np.float64
+}
+
+memory_profile_columns = {
+    'params': np.int32,
+    'positions': np.int32,
+    'done_positions': np.int32,
+    'timestamps': np.int32,
+    'seconds': np.float64,
+    'mb': np.float32
+}
+
+# Each cache file is laid out as:
+#
+#   b'BENCHCOL' | header length (uint64) | JSON header | column | column | ...
+#
+# where the header records the content hash of the source log and the
+# dtype, shape and offset of every column. Columns are 8-byte aligned
+# so that they can be viewed straight out of the memory mapped file.
+magic = b'BENCHCOL'
+alignment = 8
+
+def padding(length):
+    return -length % alignment
+
+# SHA-1 of the log file's contents, read in 1 MB chunks
+def content_hash(filename):
+    h = hashlib.sha1()
+
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+# The log's path relative to the directory we run from, e.g.
+# 'Official-memory-consumption-profile/Fibonacci/Fibonacci_GCD_opt_none'
+# --> 'Parsed-data/Official-memory-consumption-profile/Fibonacci/Fibonacci_GCD_opt_none.mem',
+# so that logs of the same name in different trees never share a cache
+# file. Logs outside that directory are keyed on a hash of their full
+# path instead: 'Parsed-data/External/<hash>/<log name><suffix>'.
+def cache_filename(filename, suffix):
+    path = os.path.abspath(filename)
+    relative = os.path.relpath(path)
+
+    if relative.split(os.sep)[0] == os.pardir:
+        directory_hash = hashlib.sha1(os.path.dirname(path).encode()).hexdigest()[:16]
+        relative = os.path.join('External', directory_hash, os.path.basename(path))
+
+    return os.path.join(cache_dir, relative + suffix)
+
+def write_columns(filename, source_hash, benchmark, columns, dtypes):
+    arrays = [(name, np.ascontiguousarray(columns[name], dtype = dtype)) for (name, dtype) in dtypes.items()]
+
+    header = {
+        'format_version': format_version,
+        'source_hash': source_hash,
+        'benchmark': benchmark,
+        'columns': []
+    }
+
+    offset = 0
+    for (name, array) in arrays:
+        header['columns'].append({
+            'name': name,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset
+        })
+        offset += array.nbytes + padding(array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b' ' * padding(len(header_bytes))
+
+    os.makedirs(os.path.dirname(filename), exist_ok = True)
+
+    # Write to a temporary file first so that an interrupted build
+    # never leaves a half-written cache file behind, and so that
+    # parallel builds never read one another's partial writes
+    tmp_filename = filename + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_filename, 'wb') as f:
+        f.write(magic)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+
+        for (name, array) in arrays:
+            f.write(array.tobytes())
+            f.write(b'\0' * padding(array.nbytes))
+
+    os.replace(tmp_filename, filename)
+
+def read_header(filename):
+    with open(filename, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            return None, 0
+
+        header_length = int(np.frombuffer(f.read(8), dtype = np.uint64)[0])
+        header = json.loads(f.read(header_length))
+
+    return header, len(magic) + 8 + header_length
+
+# Returns (benchmark, {name: read-only array backed by the memory mapped file})
+def read_columns(filename, header, data_start):
+    data = np.memmap(filename, dtype = np.uint8, mode = 'r')
+    columns = {}
+
+    for column in header['columns']:
+        dtype = np.dtype(column['dtype'])
+        start = data_start + column['offset']
+        nbytes = int(np.prod(column['shape'])) * dtype.itemsize
+
+        columns[column['name']] = data[start:start + nbytes].view(dtype).reshape(column['shape'])
+
+    return header['benchmark'], columns
+
+# Return the cached columns for 'filename', (re-)parsing the log
+# with 'read_log' whenever its content hash is not in the cache
+def load(filename, suffix, read_log, dtypes):
+    source_hash = content_hash(filename)
+    cached = cache_filename(filename, suffix)
+
+    if os.path.exists(cached):
+        header, data_start = read_header(cached)
+
+        if (header is not None
+                and header['format_version'] == format_version
+                and header['source_hash'] == source_hash):
+            return read_columns(cached, header, data_start)
+
+    log = read_log(filename)
+    write_columns(cached, source_hash, log.benchmark, log._asdict(), dtypes)
+
+    header, data_start = read_header(cached)
+    return read_columns(cached, header, data_start)
+
+# Drop-in replacements for logparser.read_execution_time_log and
+# logparser.read_memory_profile that go through the cache
+def load_execution_time_log(filename):
+    benchmark, columns = load(filename, '.time', logparser.read_execution_time_log, execution_time_columns)
+    return logparser.ExecutionTimeLog(benchmark = benchmark, **columns)
+
+def load_memory_profile(filename):
+    benchmark, columns = load(filename, '.mem', logparser.read_memory_profile, memory_profile_columns)
+    return logparser.MemoryProfile(benchmark = benchmark, **columns)
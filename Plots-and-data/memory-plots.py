@@ -1,8 +1,10 @@
-import matplotlib.pyplot as plt
-import numpy as np
-import re
+import decimate
+import logstore
+import plots
 
-fig, ax = None, None
+# Resolution the memory plots are saved at. Before drawing, each series
+# is reduced to a min/max pair per pixel column at this resolution.
+dpi = 250
 
 benchmark_versions = {
     '_GCD_opt_none': 'GCD (-Onone)',
@@ -13,10 +15,6 @@ benchmark_versions = {
     '_SC_opt_size': 'SC (-Osize)'
 }
 
-# Used to generate "zoomed in" versions of
-# the memory plots
-bench_param_positions = []
-
 def benchmark_vline_label(benchmark, parameter):
 
     if benchmark == 'SpawnManyWaiting':
@@ -32,45 +30,33 @@ def benchmark_vline_label(benchmark, parameter):
     elif benchmark == 'MatrixMultiplication':
         return '(' + parameter + 'x' + parameter + ') matrix'
 
-def plot_file(filename, label, color, benchmark):
-
-    print('\n-- Plotting', filename, '--\n')
+def memory_filename(benchmark, version):
+    return 'Official-memory-consumption-profile/' + benchmark + '/' + benchmark + version
 
-    with open(filename) as f:
-        lines = f.readlines()
-        y_values = []
+# Plot the memory profile in the supplied file on 'ax' (the current
+# axes by default). Returns the parsed profile, whose 'positions' are
+# used to generate "zoomed in" versions of the memory plots, and the
+# artists of the drawn series.
+def plot_file(filename, label, color, benchmark, ax = None):
 
-        for line in lines:
-
-            if 'mem: ' in line:
-                mb = float(line.split('mem: ')[1])
-                y_values.append(mb)
+    print('\n-- Plotting', filename, '--\n')
 
-            if 'Running' in line:
-                (*bench_param, iterations) = re.findall(r'\d+', line) # https://sparrow.dev/object-spread-operator-python/
+    if ax is None:
+        ax = plots.pyplot().gca()
 
-                plt.axvline(len(y_values))
-                plt.text(len(y_values), 2, benchmark_vline_label(benchmark, bench_param[0]), rotation = 90)
+    profile = logstore.load_memory_profile(filename)
+    y_values = profile.mb
 
-                # Save value so we can automate the plotting
-                # of "zoomed in" subgraphs
-                bench_param_positions.append(len(y_values))
+    for (bench_param, pos) in zip(profile.params, profile.positions):
+        ax.axvline(position_seconds(profile, pos))
+        ax.text(position_seconds(profile, pos), 2, benchmark_vline_label(benchmark, str(bench_param)), rotation = 90)
 
-    ax.plot(y_values, label = label, color = color, linewidth = .01)
-
-    # Color the area under the curve
-    # (https://stackoverflow.com/a/71712797/16823203)
-    t = np.arange(0,len(y_values),1)
-    plt.fill_between(
-        x = t,
-        y1 = y_values,
-        color = '#74a2f8',
-        alpha = 0.5)
+    series_artists = draw_series(ax, profile.seconds, y_values, label, color)
 
     # Ensure that the graph is stretched to fit
     # the available space of the boxplot window
-    plt.xlim([0, len(y_values)*1.05]) #plt.xlim([0, test[2]])
-    plt.ylim([0, plt.ylim()[1]])
+    ax.set_xlim([0, position_seconds(profile, len(y_values))*1.05])
+    ax.set_ylim([0, ax.get_ylim()[1]])
 
     # Annotating axes and plot title
     ax.set_xlabel('Time (seconds)')
@@ -78,72 +64,110 @@ def plot_file(filename, label, color, benchmark):
     ax.set_title('' + benchmark + ' memory consumption profile')
     ax.legend()
 
-def plot_benchmark(benchmark, version):
-    global fig, ax
+    return profile, series_artists
+
+# Time (seconds) of the sample at index 'pos' of a profile. A header
+# after the last sample is placed where the next sample would have been.
+def position_seconds(profile, pos):
+    if pos < len(profile.seconds):
+        return profile.seconds[pos]
+
+    if len(profile.seconds) < 2:
+        return 0
+
+    return profile.seconds[-1] + (profile.seconds[-1] - profile.seconds[0]) / (len(profile.seconds) - 1)
+
+# Draw the samples of y_values before index 'stop' (all of them by
+# default) at their times 'x_values' and return the line and fill.
+# Only the min/max envelope per pixel column is drawn, so the cost
+# of drawing does not depend on the number of samples.
+def draw_series(ax, x_values, y_values, label, color, stop = None):
+    columns = int(ax.figure.get_figwidth() * dpi)
+    t = decimate.minmax_indices(y_values[:stop], columns)
+
+    line, = ax.plot(x_values[t], y_values[t], label = label, color = color, linewidth = .01)
+
+    # Color the area under the curve
+    # (https://stackoverflow.com/a/71712797/16823203)
+    fill = ax.fill_between(
+        x = x_values[t],
+        y1 = y_values[t],
+        color = '#74a2f8',
+        alpha = 0.5)
+
+    return [line, fill]
+
+def save_figure(fig, fname):
+    fig.savefig(
+        fname = fname,
+        dpi = dpi,
+        facecolor = 'w',
+        edgecolor = 'w',
+        orientation = 'portrait',
+        format = None,
+        transparent = False,
+        bbox_inches = None,
+        pad_inches = 0.1,
+        metadata = None)
 
+def plot_benchmark(benchmark, version):
+    plt = plots.pyplot()
     fig, ax = plt.subplots(figsize = (10, 4))
 
     label = benchmark_versions[version]
 
     plot_file(
-        filename = 'Official-memory-consumption-profile/' + benchmark + '/' + benchmark + version,
+        filename = memory_filename(benchmark, version),
         label = 'Memory, ' + label,
         color = '#2b60c0',
-        benchmark = benchmark)
+        benchmark = benchmark,
+        ax = ax)
 
     plt.show()
 
+# Plot one version of a benchmark to file on a figure of its own.
+# 'zoom_positions' selects which "zoomed in" parts to save as well
+# (all bench_param positions by default), and 'full' whether to save
+# the full profile, so that every saved figure can be its own job.
+def plot_version_to_file(benchmark, version, zoom_positions = None, full = True):
+    plt = plots.pyplot()
+    fig, ax = plt.subplots(figsize = (10, 4))
+    label = 'Memory, ' + benchmark_versions[version]
+
+    profile, series_artists = plot_file(
+        filename = memory_filename(benchmark, version),
+        label = label,
+        color = '#2b60c0',
+        benchmark = benchmark,
+        ax = ax)
+
+    if full:
+        save_figure(fig, 'Memory-plots/' + benchmark + '/' + benchmark + version)
+
+    if zoom_positions is None:
+        zoom_positions = profile.positions
+
+    # Plot and save "zoomed in" parts as well. A position of 0
+    # (a header before the first sample) has nothing to zoom in on.
+    for pos in zoom_positions:
+        if pos == 0:
+            continue
+
+        ax.set_xlim([0, position_seconds(profile, pos)])
+
+        # Re-decimate for the visible part only, keeping
+        # full detail in the zoomed in plot
+        for artist in series_artists:
+            artist.remove()
+        series_artists = draw_series(ax, profile.seconds, profile.mb, label, '#2b60c0', stop = pos + 1)
+
+        save_figure(fig, 'Memory-plots/' + benchmark + '/Zoomed/' + benchmark + version + str(pos))
+
+    plt.close(fig)
+
 def plot_benchmark_to_file(benchmark):
-    global fig, ax, bench_param_positions
-
-    for (version, label) in benchmark_versions.items():
-        fig, ax = plt.subplots(figsize = (10, 4))
-        bench_param_positions = []
-
-        plot_file(
-            filename = 'Official-memory-consumption-profile/' + benchmark + '/' + benchmark + version,
-            label = 'Memory, ' + label,
-            color = '#2b60c0',
-            benchmark = benchmark)
-
-        # Convert x axis labels from FPS to seconds
-        # (https://stackoverflow.com/a/18946103/16823203)
-        a = ax.get_xticks().tolist()
-        a = map(lambda x: round(x/60, 2), a)
-        ax.set_xticklabels(a)
-
-        plt.savefig(
-            fname = 'Memory-plots/' + benchmark + '/' + benchmark + version,
-            dpi = 250,
-            facecolor = 'w',
-            edgecolor = 'w',
-            orientation = 'portrait',
-            format = None,
-            transparent = False,
-            bbox_inches = None,
-            pad_inches = 0.1,
-            metadata = None)
-
-        # Plot and save "zoomed in" parts as well
-        for pos in bench_param_positions:
-            plt.xlim([0, pos])
-
-            # Convert x axis labels from FPS to seconds
-            a = ax.get_xticks().tolist()
-            a = map(lambda x: round(x/60, 2), a)
-            ax.set_xticklabels(a)
-
-            plt.savefig(
-                fname = 'Memory-plots/' + benchmark + '/Zoomed/' + benchmark + version + str(pos),
-                dpi = 250,
-                facecolor = 'w',
-                edgecolor = 'w',
-                orientation = 'portrait',
-                format = None,
-                transparent = False,
-                bbox_inches = None,
-                pad_inches = 0.1,
-                metadata = None)
+    for version in benchmark_versions.keys():
+        plot_version_to_file(benchmark, version)
 
 def plot_all_benchmarks_to_file():
     plot_benchmark_to_file('SpawnManyWaiting')
@@ -0,0 +1,231 @@
+import os
+from collections import namedtuple
+import numpy as np
+import benchstats
+import logparser
+import logstore
+import plots
+
+## Settings
+
+# The sampler records at most 60 samples per second
+# ('Max FPS is 60 FPS' in the logs)
+sample_rate = 60
+
+# Samples at the start of a segment whose minimum is its baseline,
+# i.e. the memory in use before the bench_param started allocating
+baseline_window = 30
+
+# The logs report memory in Mb, i.e. 2^20 bytes
+bytes_per_mb = 1024 * 1024
+
+# Segments at the start of a profile left out of the per-unit cost: the
+# peak - baseline of the first one is mostly the process starting up
+skipped_segments = 1
+
+# A per-unit cost within this many standard errors of 0 is unresolved
+min_cost_stderrs = 2
+
+# What N counts in the benchmarks whose memory grows with N
+benchmark_units = {
+    'SpawnManyWaiting': 'task',
+    'SpawnManyWaitingGroup': 'task',
+    'SpawnManyActors': 'actor'
+}
+
+# One entry per bench_param (segment) of a memory profile:
+#  start, stop:   indices into the profile's 'mb' of the 'Running ...'
+#                 header and the '(..., ...) Done.' marker
+#  peak:          highest memory (Mb) in the segment
+#  baseline:      lowest of its first 'baseline_window' samples
+#  steady_state:  mean memory after the initial transient, which is cut
+#                 off by the MSER-5 rule (as for the runtime warm-up)
+#  auc:           area under the curve, in Mb * seconds
+#  growth:        least-squares slope of the steady state part, in Mb
+#                 per second; persistently positive slopes hint at a leak
+Segment = namedtuple('Segment', ['param', 'start', 'stop', 'peak', 'baseline', 'steady_state', 'auc', 'growth'])
+
+# (start, stop) of every segment: from each 'Running ...' header to the
+# 'Done.' marker that ends it, or to the next header (or the end of the
+# profile) should that segment's marker be missing. Markers are sample
+# indices, so one logged right before the next header, or right after
+# its own header, shares that header's index; taking the markers in
+# the order they were logged, a header's marker is the next one not yet
+# taken at or after it, if that is not beyond the next header.
+def segment_bounds(profile):
+    starts = profile.positions.tolist()
+    ends = starts[1:] + [len(profile.mb)]
+    dones = profile.done_positions.tolist()
+
+    bounds = []
+    j = 0
+
+    for (start, end) in zip(starts, ends):
+        # Markers before this header belong to no header
+        while j < len(dones) and dones[j] < start:
+            j += 1
+
+        if j < len(dones) and dones[j] <= end:
+            bounds.append((start, dones[j]))
+            j += 1
+        else:
+            bounds.append((start, end))
+
+    return bounds
+
+# Least-squares slope of y over x (NaN for fewer than two points)
+def slope(x, y):
+    if len(x) < 2:
+        return np.nan
+
+    x = x - x.mean()
+    return float(np.dot(x, y - y.mean()) / np.dot(x, x)) if np.dot(x, x) > 0 else np.nan
+
+def analyze_segment(param, mb, seconds, start, stop):
+    y = np.asarray(mb[start:stop], dtype = float)
+    seconds = np.asarray(seconds[start:stop])
+
+    if len(y) == 0:
+        return Segment(int(param), start, stop, np.nan, np.nan, np.nan, 0.0, np.nan)
+
+    transient = int(benchstats.mser_truncation(y))
+    steady = y[transient:]
+
+    return Segment(
+        param = int(param),
+        start = start,
+        stop = stop,
+        peak = float(y.max()),
+        baseline = float(y[:baseline_window].min()),
+        steady_state = float(steady.mean()),
+        auc = float(np.sum((y[1:] + y[:-1]) / 2 * np.diff(seconds))),
+        growth = slope(seconds[transient:], steady))
+
+# Split a memory profile (see logparser.MemoryProfile) into one
+# Segment per bench_param
+def segments(profile):
+    return [analyze_segment(param, profile.mb, profile.seconds, start, stop) for (param, (start, stop)) in zip(profile.params, segment_bounds(profile))]
+
+def profile_segments(filename):
+    return segments(logstore.load_memory_profile(filename))
+
+# resolved: whether bytes_per_unit is at least 'min_cost_stderrs' of a
+#           finite, non-zero stderr away from 0
+PerUnitCost = namedtuple('PerUnitCost', ['bytes_per_unit', 'stderr', 'intercept_bytes', 'r_squared', 'resolved'])
+
+# Memory cost per unit of N (e.g. per spawned task or actor): the
+# least-squares line through (N, peak - baseline) of every segment but
+# the first 'skipped_segments', with the standard error of its slope.
+# A slope within a couple of standard errors of 0 means the profile
+# cannot resolve the cost, e.g. when N tasks take less than the
+# sampler's resolution; so does a stderr of 0 (every segment the same)
+# or NaN (too few segments).
+def per_unit_cost(segment_list):
+    segment_list = segment_list[skipped_segments:]
+    n = np.array([segment.param for segment in segment_list], dtype = float)
+    added = np.array([segment.peak - segment.baseline for segment in segment_list]) * bytes_per_mb
+
+    valid = ~np.isnan(added)
+    n, added = n[valid], added[valid]
+
+    if len(n) < 2:
+        return PerUnitCost(np.nan, np.nan, np.nan, np.nan, False)
+
+    coefficients = np.polyfit(n, added, 1)
+    residuals = added - np.polyval(coefficients, n)
+    total = np.sum((added - added.mean())**2)
+    r_squared = 1 - np.sum(residuals**2) / total if total > 0 else np.nan
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        stderr = np.sqrt(np.sum(residuals**2) / (len(n) - 2) / np.sum((n - n.mean())**2))
+
+    resolved = bool(np.isfinite(stderr) and stderr > 0 and abs(coefficients[0]) >= min_cost_stderrs * stderr)
+
+    return PerUnitCost(float(coefficients[0]), float(stderr), float(coefficients[1]), float(r_squared), resolved)
+
+# e.g. '1234 ± 56 bytes per task (R^2 = 0.987)', or 'unresolved' (with
+# the slope in brackets if it has a stderr), so that it is not read as
+# a measurement
+def format_unit_cost(cost, unit):
+    if not cost.resolved:
+        if np.isfinite(cost.stderr) and cost.stderr > 0:
+            return 'unresolved ({:0.0f} ± {:0.0f} bytes per {})'.format(cost.bytes_per_unit, cost.stderr, unit)
+
+        return 'unresolved'
+
+    return '{:0.0f} ± {:0.0f} bytes per {} (R^2 = {:0.3f})'.format(cost.bytes_per_unit, cost.stderr, unit, cost.r_squared)
+
+# Bytes per task (or actor) of every version of a benchmark that has a
+# memory profile, as a mapping from version to PerUnitCost
+def benchmark_unit_costs(benchmark):
+    res = {}
+
+    for version in plots.benchmark_versions.keys():
+        filename = plots.memory_plots().memory_filename(benchmark, version)
+
+        if os.path.exists(filename):
+            res[version] = per_unit_cost(profile_segments(filename))
+
+    return res
+
+def print_unit_costs(benchmark):
+    unit = benchmark_units.get(benchmark, 'unit')
+
+    for (version, cost) in benchmark_unit_costs(benchmark).items():
+        print('{:<36} {}'.format(benchmark + version, format_unit_cost(cost, unit)))
+
+# How the sampler kept up over a profile:
+#  effective_rate:  samples per second over the whole profile
+#  slowest_rate:    samples in the slowest full second
+#  dropped:         samples missing to the nominal rate in the full
+#                   seconds, counting seconds without any sample too
+#  dropped_fraction: dropped / (samples + dropped) over those seconds
+SamplerStats = namedtuple('SamplerStats', ['samples', 'duration', 'effective_rate', 'slowest_rate', 'dropped', 'dropped_fraction'])
+
+def sampler_stats(profile, nominal_rate = sample_rate):
+    n = len(profile.mb)
+    duration = float(profile.seconds[-1]) if n > 1 else 0.0
+
+    # Only the full seconds, the first and last are cut short
+    starts, counts = logparser.second_buckets(profile.timestamps)
+    interior = counts[1:-1]
+    missing_seconds = int(profile.timestamps[-1] - profile.timestamps[0]) + 1 - len(counts) if n > 0 else 0
+
+    dropped = int(np.sum(np.maximum(nominal_rate - interior, 0))) + missing_seconds * nominal_rate
+    kept = int(np.sum(np.minimum(interior, nominal_rate)))
+
+    return SamplerStats(
+        samples = n,
+        duration = duration,
+        effective_rate = (n - 1) / duration if duration > 0 else np.nan,
+        slowest_rate = int(interior.min()) if len(interior) > 0 else np.nan,
+        dropped = dropped,
+        dropped_fraction = dropped / (kept + dropped) if kept + dropped > 0 else 0.0)
+
+def print_sampler_report(benchmark):
+    for version in plots.benchmark_versions.keys():
+        filename = plots.memory_plots().memory_filename(benchmark, version)
+
+        if os.path.exists(filename):
+            stats = sampler_stats(logstore.load_memory_profile(filename))
+
+            print('{:<36} {:>6} samples in {:>7.1f} s, {:>5.1f}/s (slowest second: {}), {} dropped ({:0.1%})'.format(
+                benchmark + version, stats.samples, stats.duration, stats.effective_rate, stats.slowest_rate, stats.dropped, stats.dropped_fraction))
+
+def print_segment_report(filename, unit = 'task'):
+    segment_list = profile_segments(filename)
+
+    print('\n-- ' + filename + ' --\n')
+    print('{:>8} {:>9} {:>9} {:>9} {:>9} {:>10}'.format('N', 'peak', 'baseline', 'steady', 'Mb*s', 'Mb/s'))
+
+    for segment in segment_list:
+        print('{:>8} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.1f} {:>10.4f}'.format(
+            segment.param, segment.peak, segment.baseline, segment.steady_state, segment.auc, segment.growth))
+
+    print('\n' + format_unit_cost(per_unit_cost(segment_list), unit))
+
+#print_segment_report('Official-memory-consumption-profile/SpawnManyWaiting/SpawnManyWaiting_SC_opt_speed')
+#print_segment_report('Official-memory-consumption-profile/SpawnManyActors/SpawnManyActors_SC_opt_speed', 'actor')
+#print_unit_costs('SpawnManyWaiting')
+#print_unit_costs('SpawnManyActors')
+#print_sampler_report('Fibonacci')
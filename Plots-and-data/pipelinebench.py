@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import matplotlib
+
+# Only ever renders to file
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+import benchstats
+import logparser
+import logstore
+import memstats
+import plots
+
+# Benchmarks of the analysis pipeline itself: synthetic BenchApp logs at
+# several multiples of the official data size are taken through the
+# parse, cache, stats, render and save stages, and the time and peak
+# (Python and NumPy) memory of every stage are written as JSON. Times
+# and memory come from separate runs, see run_stages.
+#
+# E.g. 'python pipelinebench.py --scales 1 10 --output pipeline-benchmark.json',
+# then 'python pipelinebench.py --compare pipeline-benchmark.json' to
+# exit with status 1 if any stage got slower than that.
+
+## Settings
+
+scales = [1, 10, 100]
+
+work_dir = 'Pipeline-benchmark'
+
+# A stage is flagged by --compare when it takes this much longer
+# (or needs this much more memory) than in the reference summary
+regression_threshold = 0.25
+
+# Stages shorter than this are too noisy to compare
+min_compared_seconds = 0.05
+
+# Resolution of the rendered figures, as for the report
+dpi = 250
+
+## Synthetic logs
+
+def format_timestamp(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S +0000')
+
+# The bench_param as BenchApp writes it after 'with' (see harness.param_texts)
+def header_text(benchmark, n):
+    return importlib.import_module('harness').param_texts(benchmark, n)
+
+# Write an execution time log like 'log' (see logparser.ExecutionTimeLog)
+# but with 'scale' times as many iterations per bench_param: the real
+# samples repeated, each with a little multiplicative noise
+def write_execution_time_log(filename, log, version, scale, rng):
+    mode, method = ('GCD', 'runGCD') if 'GCD' in version else ('async', 'runAsync')
+    name = 'GCD' if mode == 'GCD' else 'Swift concurrency'
+
+    with open(filename, 'w') as f:
+        f.write("Pressed 'Run benchmark'\n")
+        f.write("About to run '" + name + "'-version of " + log.benchmark + ' with batch mode: true\n')
+
+        for (n, row) in zip(log.params, log.samples):
+            row = row[~np.isnan(row)]
+            if len(row) == 0:
+                continue
+
+            samples = np.tile(row, scale) * rng.normal(1, 0.01, len(row) * scale)
+            header, done = header_text(log.benchmark, int(n))
+
+            f.write('Running BenchApp.' + log.benchmark + ':' + method + ' with ' + header + ' and ' + str(len(samples)) + ' iteration(s).\n\n')
+            f.write(''.join([repr(float(x)) + '\n' for x in samples]))
+            f.write('\n(' + mode + ', average, ' + done + ') Done in an average of ' + repr(float(samples.mean())) + ' seconds.\n\n')
+
+        f.write('Benchmark done\n')
+
+# Write a memory consumption profile like 'profile' with every segment
+# 'scale' times as long (its samples repeated), timestamped at 60 FPS
+def write_memory_profile(filename, profile, version, scale):
+    mode, method = ('GCD', 'runGCD') if 'GCD' in version else ('async', 'runAsync')
+    name = 'GCD' if mode == 'GCD' else 'Swift concurrency'
+    epoch = int(profile.timestamps[0]) if len(profile.timestamps) > 0 else 0
+    count = 0
+
+    ends = np.append(profile.positions[1:], len(profile.mb))
+
+    with open(filename, 'w') as f:
+        f.write("Pressed 'Run benchmark'\nStarting memory measurement. Max FPS is 60 FPS.\n")
+        f.write("About to run '" + name + "'-version of " + profile.benchmark + ' with batch mode: true\n')
+
+        for (n, start, end) in zip(profile.params, profile.positions, ends):
+            header, done = header_text(profile.benchmark, int(n))
+            f.write('Running BenchApp.' + profile.benchmark + ':' + method + ' with ' + header + ' and 110 iteration(s).\n\n')
+
+            values = np.tile(profile.mb[start:end], scale)
+            seconds = epoch + (count + np.arange(len(values))) // 60
+            count += len(values)
+
+            f.write(''.join([format_timestamp(int(t)) + ', mem: ' + repr(float(mb)) + '\n' for (t, mb) in zip(seconds, values)]))
+            f.write('\n(' + mode + ', ' + done + ') Done.\n\n')
+
+        f.write('Benchmark done')
+
+# Write synthetic versions of every official log of 'benchmarks' at
+# 'scale' times their size under '<directory>/x<scale>/'. Returns the
+# (execution time, memory) filenames written.
+def write_synthetic_logs(directory, scale, benchmarks = None, seed = 1):
+    if benchmarks is None:
+        benchmarks = list(plots.benchmark_titles.keys())
+
+    rng = np.random.default_rng(seed)
+    time_files, memory_files = [], []
+
+    for benchmark in benchmarks:
+        for version in plots.benchmark_versions.keys():
+            source = plots.execution_time_filename(benchmark, version)
+            filename = os.path.join(directory, 'x' + str(scale), 'Official-execution-time', benchmark, benchmark + version)
+            os.makedirs(os.path.dirname(filename), exist_ok = True)
+            write_execution_time_log(filename, logparser.read_execution_time_log(source), version, scale, rng)
+            time_files.append(filename)
+
+            source = plots.memory_plots().memory_filename(benchmark, version)
+            if not os.path.exists(source):
+                continue
+
+            filename = os.path.join(directory, 'x' + str(scale), 'Official-memory-consumption-profile', benchmark, benchmark + version)
+            os.makedirs(os.path.dirname(filename), exist_ok = True)
+            write_memory_profile(filename, logparser.read_memory_profile(source), version, scale)
+            memory_files.append(filename)
+
+    return time_files, memory_files
+
+## Stage instrumentation
+
+def stage_entry(results, name):
+    return results.setdefault(name, {'seconds': 0.0, 'peak_mb': 0.0})
+
+# Wall time of the code run in the 'with' block, added to
+# results[name] (so a stage run for several logs accumulates)
+@contextlib.contextmanager
+def timed_stage(results, name):
+    start = time.perf_counter()
+    yield
+    stage_entry(results, name)['seconds'] += time.perf_counter() - start
+
+# Peak memory allocated (as traced by tracemalloc, which must be
+# running) by the code run in the 'with' block, the highest of all
+# runs of the stage in results[name]
+@contextlib.contextmanager
+def traced_stage(results, name):
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    yield
+    _, peak = tracemalloc.get_traced_memory()
+
+    entry = stage_entry(results, name)
+    entry['peak_mb'] = max(entry['peak_mb'], (peak - base) / (1024 * 1024))
+
+# Take the logs through every stage of the pipeline once, measuring
+# each stage with 'stage(name)'. The parsed-log cache is removed first,
+# so that 'cache_cold' really parses and writes every log.
+def run_pipeline(time_files, memory_files, stage):
+    shutil.rmtree(logstore.cache_dir, ignore_errors = True)
+
+    # The log output of the plot functions is not part of the benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        with stage('parse'):
+            for filename in time_files:
+                logparser.read_execution_time_log(filename)
+            for filename in memory_files:
+                logparser.read_memory_profile(filename)
+
+        with stage('cache_cold'):
+            logs = [logstore.load_execution_time_log(filename) for filename in time_files]
+            profiles = [logstore.load_memory_profile(filename) for filename in memory_files]
+
+        with stage('cache_warm'):
+            logs = [logstore.load_execution_time_log(filename) for filename in time_files]
+            profiles = [logstore.load_memory_profile(filename) for filename in memory_files]
+
+        with stage('stats'):
+            for log in logs:
+                samples = benchstats.discard_leading(log.samples, benchstats.mser_truncation(log.samples))
+                # Every bench_param against every other, as for versions
+                benchstats.welch_comparison(benchstats.summarize(samples))
+                benchstats.stopping_samples(samples)
+            for profile in profiles:
+                memstats.segments(profile)
+
+        for filename in time_files:
+            fig, ax = plt.subplots(figsize = (10, 4))
+
+            with stage('render'):
+                plots.plot_file(filename, 'synthetic', 'C0', os.path.basename(os.path.dirname(filename)), ax = ax)
+                fig.canvas.draw()
+
+            with stage('save'):
+                fig.savefig(io.BytesIO(), dpi = dpi, format = 'png')
+
+            plt.close(fig)
+
+        for filename in memory_files:
+            fig, ax = plt.subplots(figsize = (10, 4))
+
+            with stage('render'):
+                plots.memory_plots().plot_file(filename, 'synthetic', '#2b60c0', os.path.basename(os.path.dirname(filename)), ax = ax)
+                fig.canvas.draw()
+
+            with stage('save'):
+                fig.savefig(io.BytesIO(), dpi = dpi, format = 'png')
+
+            plt.close(fig)
+
+# Run the pipeline from within 'directory' (where its parsed-log cache
+# goes) twice: once timed, and once with tracemalloc tracing the peak
+# memory of every stage. Tracing slows Python code down several times,
+# so the times are only ever taken from the untraced run.
+def run_stages(directory, time_files, memory_files):
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(directory)
+
+    time_files = [os.path.relpath(filename, directory) for filename in time_files]
+    memory_files = [os.path.relpath(filename, directory) for filename in memory_files]
+
+    try:
+        run_pipeline(time_files, memory_files, lambda name: timed_stage(results, name))
+
+        tracemalloc.start()
+        try:
+            run_pipeline(time_files, memory_files, lambda name: traced_stage(results, name))
+        finally:
+            tracemalloc.stop()
+    finally:
+        os.chdir(cwd)
+
+    return results
+
+def log_size(filenames):
+    return {
+        'files': len(filenames),
+        'bytes': sum([os.path.getsize(filename) for filename in filenames])
+    }
+
+# Benchmark the pipeline at every scale. Returns the summary:
+# {'x<scale>': {'logs': {...}, 'stages': {stage: {'seconds', 'peak_mb'}}}}
+def run_suite(scales = scales, benchmarks = None, directory = work_dir):
+    summary = {}
+
+    for scale in scales:
+        print('-- Writing synthetic logs at', str(scale) + 'x --', file = sys.stderr)
+        time_files, memory_files = write_synthetic_logs(directory, scale, benchmarks)
+
+        print('-- Running the pipeline at', str(scale) + 'x --', file = sys.stderr)
+        summary['x' + str(scale)] = {
+            'logs': {'execution_time': log_size(time_files), 'memory': log_size(memory_files)},
+            'stages': run_stages(os.path.join(directory, 'x' + str(scale)), time_files, memory_files)
+        }
+
+    return summary
+
+# Stages of 'summary' that take more than 'threshold' longer, or need
+# that much more memory, than in 'reference', as printable lines
+def compare(summary, reference, threshold = regression_threshold):
+    regressions = []
+
+    for (scale, entry) in summary.items():
+        for (name, measured) in entry['stages'].items():
+            before = reference.get(scale, {}).get('stages', {}).get(name)
+
+            if before is None:
+                continue
+
+            if before['seconds'] >= min_compared_seconds and measured['seconds'] > before['seconds'] * (1 + threshold):
+                regressions.append('{} {}: {:0.3f} s vs. {:0.3f} s'.format(scale, name, measured['seconds'], before['seconds']))
+
+            if before['peak_mb'] > 0 and measured['peak_mb'] > before['peak_mb'] * (1 + threshold):
+                regressions.append('{} {}: {:0.1f} Mb vs. {:0.1f} Mb peak'.format(scale, name, measured['peak_mb'], before['peak_mb']))
+
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the log analysis pipeline on synthetic logs')
+    parser.add_argument('--scales', type = int, nargs = '+', default = scales)
+    parser.add_argument('--benchmarks', nargs = '+', help = 'default: all six')
+    parser.add_argument('--directory', default = work_dir, help = 'where the synthetic logs are written')
+    parser.add_argument('--output', default = 'pipeline-benchmark.json', help = 'summary file (- for stdout)')
+    parser.add_argument('--compare', help = 'reference summary; exit 1 if any stage regressed against it')
+    parser.add_argument('--threshold', type = float, default = regression_threshold)
+
+    args = parser.parse_args(argv)
+    summary = run_suite(args.scales, args.benchmarks, args.directory)
+
+    if args.output == '-':
+        json.dump(summary, sys.stdout, indent = 2)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent = 2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(summary, json.load(f), args.threshold)
+
+        for line in regressions:
+            print('REGRESSION', line)
+
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,43 @@
-import re
-import matplotlib.pyplot as plt
+import contextlib
+import csv
+import importlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pprint
+import benchstats
+import logstore
 
 ## Settings
+
+# Warm-up iterations discarded from the start of every series, or
+# 'auto' to pick the number per series with the MSER-5 rule
 iterations_to_discard = 10
 
+# Percentile mode, in increasing order: a line for the first one
+# (p50), a band from it to the last but one (p99), dashed lines for
+# those in between (p90), and the last one (the max) marked above it
+tail_percentiles = [50, 90, 99, 100]
+
+# Number of log-spaced bins in the latency histograms
+histogram_bins = 40
+
+# How the confidence intervals of means (and of their differences) are
+# computed: 'normal' for z * s / sqrt(n), which assumes independent
+# iterations, or 'block_bootstrap' for the moving-block bootstrap (see
+# benchstats.block_bootstrap), which holds up when back-to-back
+# iterations are autocorrelated, e.g. on a throttling device
+ci_method = 'normal'
+
+# Worker processes for bootstrapping, one benchmark version per job
+# (with 1, the bootstraps run in this process)
+bootstrap_workers = os.cpu_count()
+
+# Seed of the bootstrap, so that the intervals are reproducible
+bootstrap_seed = 1
+
 benchmark_versions = {
     '_GCD_opt_none' : 'GCD (-Onone)',
     '_GCD_opt_speed': 'GCD (-O)',
@@ -57,129 +89,241 @@ version_colors = {
     '_SC_opt_size': c_SC_opt_size
 }
 
-fig, ax = None, None
+# Importing pyplot takes most of the startup time of this module, and
+# the stats and tables never draw anything, so only the functions that
+# do import it (the CLI in analyze.py can then answer queries quickly)
+def pyplot():
+    import matplotlib.pyplot
+    return matplotlib.pyplot
+
+# The memory plot script has a '-' in its name, so it
+# cannot be imported with a plain import statement
+def memory_plots():
+    return importlib.import_module('memory-plots')
+
+def execution_time_filename(benchmark, version):
+    return 'Official-execution-time/' + benchmark + '/' + benchmark + version
+
+# Load the per-iteration samples of several versions of a benchmark into
+# one (version x param x iteration) array. Versions that lack a
+# bench_param (e.g. the GCD versions of NQueens stop at 5 queens) get
+# NaN for it, which benchstats treats as "no samples".
+def get_samples(benchmark, versions = None):
+    if versions is None:
+        versions = list(benchmark_versions.keys())
+
+    logs = [logstore.load_execution_time_log(execution_time_filename(benchmark, version)) for version in versions]
+
+    params = np.unique(np.concatenate([log.params for log in logs]))
+    iterations = max([log.samples.shape[1] for log in logs])
+    samples = np.full((len(logs), len(params), iterations), np.nan)
+
+    for (i, log) in enumerate(logs):
+        rows = np.searchsorted(params, log.params)
+        samples[i, rows, :log.samples.shape[1]] = log.samples
+
+    return params, samples
+
+# Discard the warm-up iterations of every series along the last axis of
+# 'samples', according to 'iterations_to_discard'. Returns the samples
+# (discarded ones set to NaN) and the number discarded from each series.
+def discard_warmup(samples):
+    samples = np.asarray(samples, dtype = float)
+
+    if iterations_to_discard == 'auto':
+        discards = benchstats.mser_truncation(samples)
+    else:
+        discards = np.full(samples.shape[:-1], iterations_to_discard)
+
+    return benchstats.discard_leading(samples, discards), discards
+
+# Whether the automatic warm-up detection ran into its cap (see
+# benchstats.mser_cap_reached) for each of the series of discard_warmup
+def warmup_capped(samples, discards):
+    if iterations_to_discard != 'auto':
+        return np.zeros(np.shape(discards), dtype = bool)
 
-# Calculate sample standard deviation
-def sample_s(samples, sample_mean):
-    # NB: This whole function seems equivalent to just: np.std(samples, ddof = 1)
-    # (https://numpy.org/doc/stable/reference/generated/numpy.std.html)
+    return benchstats.mser_cap_reached(samples, discards)
 
-    res = 0
-    for x_i in samples:
-        res += (x_i - sample_mean)**2
+# Warm-up iterations discarded from each series of a benchmark, as a
+# mapping from version to {bench_param: (discarded iterations, capped)},
+# where 'capped' is set if the discards are only limited by the cap
+def get_warmup_discards(benchmark):
+    versions = list(benchmark_versions.keys())
+    params, samples = get_samples(benchmark, versions)
+    _, discards = discard_warmup(samples)
+    capped = warmup_capped(samples, discards)
+    n = benchstats.sample_counts(samples)
 
-    res /= (len(samples) - 1)
-    res = np.sqrt(res)
+    res = {}
+    for (i, version) in enumerate(versions):
+        res[version] = {int(bench_param): (int(discards[i, j]), bool(capped[i, j])) for (j, bench_param) in enumerate(params) if n[i, j] > 0}
 
     return res
 
-# Calculate sample varaince
-def sample_variance(samples, sample_mean):
-    res = 0
-    for x_i in samples:
-        res += (x_i - sample_mean)**2
+# Discards marked with '*' are at the cap, the warm-up may be longer
+def print_warmup_report(benchmark):
+    print('\n-- Warm-up iterations discarded in', benchmark, '(iterations_to_discard = ' + str(iterations_to_discard) + ') --\n')
 
-    res /= (len(samples) - 1)
-    return res
+    for (version, discards) in get_warmup_discards(benchmark).items():
+        print('{:<14}'.format(benchmark_versions[version]), '  '.join([str(bench_param) + ': ' + str(discard) + ('*' if capped else '') for (bench_param, (discard, capped)) in discards.items()]))
 
-# Create a plot based on data in the supplied file, populating
-# the global 'fig' and 'ax' variables.
-def plot_file(filename, label, color, benchmark, marker = '.'):
+    if iterations_to_discard == 'auto':
+        print('\n* at the cap of', benchstats.mser_max_fraction, 'of the series: the warm-up may be longer')
+
+# E.g. 99 --> 'p99', 99.9 --> 'p99.9' and 100 --> 'max'
+def percentile_name(p):
+    return 'max' if p == 100 else 'p{:g}'.format(p)
+
+# Create a plot based on data in the supplied file on 'ax' (the
+# current axes by default). With 'percentiles' set, the tail
+# percentiles of the per-iteration samples are drawn instead
+# of the mean and its confidence interval.
+def plot_file(filename, label, color, benchmark, marker = '.', percentiles = False, ax = None):
 
     print('\n-- Plotting', filename, '--\n')
 
-    with open(filename) as f:
-        lines = f.readlines()
-
-        x_values = []
-        y_values = []
-        ci_lower = []
-        ci_upper = []
-
-        samples = []
-        bench_param = 0
-        iterations = 0
-
-        for line in lines:
-
-            if line.startswith('Running'):
-                if 'MatrixMultiplication' in line:
-                    # E.g. 'Running BenchApp.MatrixMultiplication:runAsync with (25x25) matrix and 110 iteration(s).'
-                    # --> bench_param, _, iterations = [25, 25, 110]
-                    bench_param, _, iterations = list(map(int, re.findall(r'\d+', line))) # https://stackoverflow.com/a/5306100/16823203 for map(int, ...) trick
-                else:
-                    # All other 'Running ...' lines are for benchmarks with 1 parameter, e.g.:
-                    # 'Running BenchApp.Fibonacci:runAsync with fib(5) and 110 iteration(s).'
-                    # 'Running BenchApp.SpawnManyActors:runAsync with 100 actor(s) and 110 iteration(s).'
-                    # etc.
-                    bench_param, iterations = list(map(int, re.findall(r'\d+', line)))
-                continue
+    if ax is None:
+        ax = pyplot().gca()
 
-            if 'average' in line:
-                relevant_samples = samples[iterations_to_discard:]
+    log = logstore.load_execution_time_log(filename)
+    samples, discards = discard_warmup(log.samples)
+    summary = benchstats.summarize(samples, percentiles = tail_percentiles)
 
-                swift_avg = float(re.findall(r'(\d+\.?\d*(?:e-?)?\d+) seconds', line)[0])
+    if iterations_to_discard == 'auto':
+        print('Warm-up iterations discarded:', dict(zip(log.params.tolist(), discards.tolist())))
 
-                s = sample_s(relevant_samples, swift_avg)
+        capped = warmup_capped(log.samples, discards)
+        if capped.any():
+            print('Warm-up may be longer than discarded (at the cap) for N =', log.params[capped].tolist())
 
-                # https://stackoverflow.com/a/59747610/16823203 for confidence interval plotting in matplotlib
-                # z table: https://www.math.arizona.edu/~rsims/ma464/standardnormaltable.pdf
-                # or: https://www.sjsu.edu/faculty/gerstman/StatPrimer/t-table.pdf (z at bottom of table)
-                ci = 1.96 * s/np.sqrt(len(relevant_samples)) # 3.291 for 99.9% interval
+    # A last 'Running ...' header without samples (e.g. 6 queens in the
+    # GCD NQueens logs) is no measurement, so it is left off the plot
+    measured = summary.n > 0
+    x_values = log.params[measured]
 
-                ci_lower.append(swift_avg-ci)
-                ci_upper.append(swift_avg+ci)
+    if (not percentiles):
+        # https://stackoverflow.com/a/59747610/16823203 for confidence interval plotting in matplotlib
+        y_values = summary.mean[measured]
+        ci_lower = (summary.mean - summary.ci)[measured]
+        ci_upper = (summary.mean + summary.ci)[measured]
 
-                x_values.append(bench_param)
-                y_values.append(swift_avg)
+        if ci_method == 'block_bootstrap':
+            version = os.path.basename(filename)[len(benchmark):]
+            means, _, _ = benchstats.block_bootstrap(samples, seed = bootstrap_job_seed(benchmark, version))
+            ci_lower, ci_upper = [bound[measured] for bound in benchstats.bootstrap_interval(means)]
 
-                samples = []
-                continue
+        # Plot the execution time and confidence interval
+        ax.plot(x_values, y_values, label = label, color = color, marker = marker, markersize = 7, linewidth = .5)
+        ax.fill_between(x_values, ci_lower, ci_upper, color = color, alpha = .1)
+
+        ax.set_ylabel('Runtime (seconds)')
+    else:
+        values = [summary.percentiles[measured, i] for i in range(len(tail_percentiles))]
+        names = [percentile_name(p) for p in tail_percentiles]
+        described = [names[0]]
+
+        ax.plot(x_values, values[0], label = label, color = color, marker = marker, markersize = 7, linewidth = .5)
 
-            if 'Benchmark done' in line:
-                break
+        for i in range(1, len(values) - 2):
+            ax.plot(x_values, values[i], color = color, linestyle = '--', linewidth = .5)
+            described.append(names[i] + ' (dashed)')
 
-            # If line does not start with 'Running' or contains 'average', the line is the
-            # time that one benchmark iteration took, hence we add it to the samples array.
-            if re.findall(r'\d+\.?\d*(?:e-?)?\d+', line) != []:
-                samples.append(float(re.findall(r'\d+\.?\d*(?:e-?)?\d+', line)[0]))
+        if len(values) > 2:
+            ax.fill_between(x_values, values[0], values[-2], color = color, alpha = .1)
+            described.append(names[-2] + ' band')
 
-    # Plot the execution time and confidence interval
-    ax.plot(x_values, y_values, label = label, color = color, marker = marker, markersize = 7, linewidth = .5)
-    ax.fill_between(x_values, ci_lower, ci_upper, color = color, alpha = .1)
+        if len(values) > 1:
+            ax.plot(x_values, values[-1], color = color, marker = '_', markersize = 7, linestyle = 'none')
+            described.append(names[-1])
+
+        ax.set_ylabel('Runtime (seconds): ' + ', '.join(described))
 
     # Annotating axes and plot title
     ax.set_xlabel(benchmark_xlabels[benchmark])
-    ax.set_ylabel('Runtime (seconds)')
     ax.set_title(benchmark_titles[benchmark])
     ax.legend()
 
     # If you want to set different background color in graph
     #ax.set_facecolor((0.95, 0.95, 0.92))
 
-# Actually plot the benchmark, either to screen or to file
-def plot_benchmark(benchmark, save_to_file = False):
-    global fig, ax
+# Actually plot the benchmark (all versions, or only 'versions'),
+# either to screen or to file
+def plot_benchmark(benchmark, save_to_file = False, percentiles = False, versions = None):
+    if versions is None:
+        versions = list(benchmark_versions.keys())
 
+    plt = pyplot()
     fig, ax = plt.subplots(figsize = (6.5, 5.3))
 
-    for (version, label) in benchmark_versions.items():
+    for version in versions:
 
         plot_file(
-            filename = 'Official-execution-time/' + benchmark + '/' + benchmark + version,
-            label = label,
+            filename = execution_time_filename(benchmark, version),
+            label = benchmark_versions[version],
             color = version_colors[version],
-            benchmark = benchmark)
+            benchmark = benchmark,
+            percentiles = percentiles,
+            ax = ax)
 
     if (not save_to_file):
         plt.tight_layout(pad=1.1)
         plt.show()
     else:
-        plt.savefig('Execution-time-plots/' + benchmark,
+        fig.savefig('Execution-time-plots/' + benchmark + ('_percentiles' if percentiles else ''),
             dpi = 250,
             transparent = False,
             bbox_inches = 'tight',
             pad_inches = 0.1)
+        plt.close(fig)
+
+# Plot one histogram per bench_param of the per-iteration
+# runtimes of every version, on log-spaced bins so that
+# the GCD and SC tails can be compared
+def plot_latency_histograms(benchmark, save_to_file = False):
+    plt = pyplot()
+    versions = list(benchmark_versions.keys())
+    params, samples = get_samples(benchmark, versions)
+    samples, _ = discard_warmup(samples)
+
+    for (j, bench_param) in enumerate(params):
+        param_samples = samples[:, j]
+
+        # Same bins for all versions so that the bars line up
+        bins = np.geomspace(np.nanmin(param_samples), np.nanmax(param_samples), histogram_bins + 1)
+
+        fig, ax = plt.subplots(figsize = (6.5, 5.3))
+
+        for (i, version) in enumerate(versions):
+            values = param_samples[i][~np.isnan(param_samples[i])]
+
+            if len(values) == 0:
+                continue
+
+            ax.hist(values,
+                bins = bins,
+                histtype = 'step',
+                color = version_colors[version],
+                linestyle = '-' if version.startswith('_GCD') else '--',
+                label = benchmark_versions[version])
+
+        ax.set_xscale('log')
+        ax.set_xlabel('Runtime (seconds)')
+        ax.set_ylabel('Number of iterations')
+        ax.set_title(benchmark + ' latency distribution (' + benchmark_xlabels[benchmark] + ' = ' + str(bench_param) + ')')
+        ax.legend()
+
+        if (not save_to_file):
+            plt.tight_layout(pad=1.1)
+            plt.show()
+        else:
+            os.makedirs('Latency-histograms/' + benchmark, exist_ok = True)
+            fig.savefig('Latency-histograms/' + benchmark + '/' + benchmark + '_' + str(bench_param),
+                dpi = 250,
+                transparent = False,
+                bbox_inches = 'tight',
+                pad_inches = 0.1)
+            plt.close(fig)
 
 # Plot all six benchmarks to file
 def plot_all_benchmarks_to_file():
@@ -190,10 +334,17 @@ def plot_all_benchmarks_to_file():
     plot_benchmark('NQueens', save_to_file = True)
     plot_benchmark('MatrixMultiplication', save_to_file = True)
 
+# Percentile plots and latency histograms for all six benchmarks
+def plot_all_tail_latencies_to_file():
+    for benchmark in benchmark_titles.keys():
+        plot_benchmark(benchmark, save_to_file = True, percentiles = True)
+        plot_latency_histograms(benchmark, save_to_file = True)
+
 # Calculate sample mean and variance for all benchmark
 # parameters of a certain benchmark version
 def get_stats(benchmark, version):
-    filename = 'Official-execution-time/' + benchmark + '/' + benchmark + version
+    params, samples = get_samples(benchmark, [version])
+    summary = benchstats.summarize(discard_warmup(samples[0])[0])
 
     # 'res' will contain mappings for
     # bench_param -> [sample_mean, sample_variance]
@@ -207,91 +358,267 @@ def get_stats(benchmark, version):
     # ]
     res = {}
 
-    with open(filename) as f:
-        lines = f.readlines()
-
-        samples = []
-        bench_param = 0
-        iterations = 0
-
-        for line in lines:
-
-            if line.startswith('Running'):
-                if 'MatrixMultiplication' in line:
-                    # E.g. 'Running BenchApp.MatrixMultiplication:runAsync with (25x25) matrix and 110 iteration(s).'
-                    # --> bench_param, _, iterations = [25, 25, 110]
-                    bench_param, _, iterations = list(map(int, re.findall(r'\d+', line))) # https://stackoverflow.com/a/5306100/16823203 for map(int, ...) trick
-                else:
-                    # All other 'Running ...' lines are for benchmarks with 1 parameter, e.g.:
-                    # 'Running BenchApp.Fibonacci:runAsync with fib(5) and 110 iteration(s).'
-                    # 'Running BenchApp.SpawnManyActors:runAsync with 100 actor(s) and 110 iteration(s).'
-                    # etc.
-                    bench_param, iterations = list(map(int, re.findall(r'\d+', line)))
-                continue
-
-            if 'average' in line:
-                relevant_samples = samples[iterations_to_discard:]
-
-                swift_avg = float(re.findall(r'(\d+\.?\d*(?:e-?)?\d+) seconds', line)[0])
-                var = sample_variance(relevant_samples, swift_avg)
+    # bench_params without samples (e.g. a last header the benchmark
+    # never ran) have no mean, and NaN is not valid JSON
+    for (bench_param, n, mean, var) in zip(params, summary.n, summary.mean, summary.variance):
+        if n > 0:
+            res[int(bench_param)] = [float(mean), float(var)]
 
-                # Save average and variance
-                res[bench_param] = [swift_avg, var]
-
-                samples = []
-                continue
+    return res
 
-            if 'Benchmark done' in line:
-                break
+# How many iterations each version and bench_param of a benchmark needs
+# for its CI half-width to be within benchstats.target_relative_ci of
+# the mean, judged from the samples we already have. 'warmup' is the
+# number of iterations discarded, 'measured' the number of samples the
+# stopping rule needs after that, and 'iterations' their sum, which is
+# what the harness should run. 'reached' is False when the existing
+# samples never got there, and 'measured' is then an estimate.
+def get_iteration_plan(benchmark, target = None):
+    if target is None:
+        target = benchstats.target_relative_ci
+
+    versions = list(benchmark_versions.keys())
+    params, samples = get_samples(benchmark, versions)
+    kept, discards = discard_warmup(samples)
+    needed, reached = benchstats.stopping_samples(kept, target = target)
+    n = benchstats.sample_counts(samples)
 
-            # If line does not start with 'Running' or contains 'average', the line is the
-            # time that one benchmark iteration took, hence we add it to the samples array.
-            if re.findall(r'\d+\.?\d*(?:e-?)?\d+', line) != []:
-                samples.append(float(re.findall(r'\d+\.?\d*(?:e-?)?\d+', line)[0]))
+    res = {}
+    for (i, version) in enumerate(versions):
+        res[version] = {}
+
+        for (j, bench_param) in enumerate(params):
+            if n[i, j] > 0:
+                res[version][str(bench_param)] = {
+                    'warmup': int(discards[i, j]),
+                    'measured': int(needed[i, j]),
+                    'iterations': int(discards[i, j] + needed[i, j]),
+                    'reached': bool(reached[i, j])
+                }
 
     return res
 
-# Generate LaTeX source code for approximate confidence intervals
-# for difference between means of GCD and SC versions
-def generate_comparison_tables(benchmark):
+# Write the iteration plan of all six benchmarks as JSON, mapping
+# benchmark -> version -> bench_param -> plan (see get_iteration_plan)
+def write_iteration_plan(filename = 'iteration-plan.json', target = None):
+    plan = {}
+
+    for benchmark in benchmark_titles.keys():
+        plan[benchmark] = get_iteration_plan(benchmark, target)
+
+    with open(filename, 'w') as f:
+        json.dump(plan, f, indent = 2)
+
+    # Summarize how the plan compares to the current campaign
+    planned = sum([entry['iterations'] for versions in plan.values() for params in versions.values() for entry in params.values()])
+    runs = sum([len(params) for versions in plan.values() for params in versions.values()])
+    print('Planned', planned, 'iterations for', runs, 'runs (' + str(runs * 110) + ' at 110 iterations each)')
+
+# Autocorrelation and moving-block bootstrap of every series, with
+# fields of shape (version x param), and (version x param x resample)
+# for the bootstrapped means and medians:
+#  ess:           effective sample size (see benchstats.effective_sample_size)
+#  tau:           integrated autocorrelation time
+#  block_length:  block length of the bootstrap
+#  means,
+#  medians:       the mean and median of every resample
+Bootstrap = namedtuple('Bootstrap', ['ess', 'tau', 'block_length', 'means', 'medians'])
+
+# Seed of the bootstrap of one benchmark version, derived from 'seed'
+# (bootstrap_seed by default) and the benchmark and version, so that
+# the result does not depend on which series are bootstrapped together,
+# and the plots (plot_file) resample each series as the tables do
+def bootstrap_job_seed(benchmark, version, seed = None):
+    if seed is None:
+        seed = bootstrap_seed
+
+    return np.random.SeedSequence([seed, list(benchmark_titles).index(benchmark), list(benchmark_versions).index(version)])
+
+# Bootstrap every version of several benchmarks (after discarding the
+# warm-up) in a pool of 'workers' processes, one benchmark version per
+# job, each with its own seed (see bootstrap_job_seed). Returns a
+# mapping from benchmark to (versions, params, bootstrap).
+def bootstrap_benchmarks(benchmarks = None, versions = None, resamples = benchstats.bootstrap_resamples, seed = None, workers = None):
+    if benchmarks is None:
+        benchmarks = list(benchmark_titles.keys())
+    if versions is None:
+        versions = list(benchmark_versions.keys())
+    if seed is None:
+        seed = bootstrap_seed
+    if workers is None:
+        workers = bootstrap_workers
+
+    kept = {}
+    jobs = []
+
+    for benchmark in benchmarks:
+        params, samples = get_samples(benchmark, versions)
+        kept[benchmark] = (params, discard_warmup(samples)[0])
+
+        for (i, version) in enumerate(versions):
+            jobs.append((kept[benchmark][1][i], resamples, bootstrap_job_seed(benchmark, version, seed)))
+
+    if workers == 1:
+        results = list(map(benchstats.block_bootstrap, *zip(*jobs)))
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            results = list(pool.map(benchstats.block_bootstrap, *zip(*jobs)))
 
-    # 'stats' will contain mappings from version to
-    # dictionary of bench_params, and then
-    # bench_param -> [sample_mean, sample_variance]
-    #
-    # So, for SpawnManyWaiting, for example, it could be:
-    # {'_GCD_opt_none':
-    #   {
-    #       2 : [0.2094, 0.002],
-    #       4 : [0.4185, 0.018],
-    #       6 : [0.6285, 0.023],
-    #       8 : [0.8379, 0.021],
-    #       10: [1.0452, 0.015]
-    #   },
-    # '_GCD_opt_speed':
-    #   {
-    #       2 : [0.2088, 0.019],
-    #       4 : [0.4183, 0.018],
-    #       6 : [0.6285, 0.023],
-    #       8 : [0.8376, 0.021],
-    #       10: [1.0452, 0.015]
-    #   },
-    #   ...
-    # }
-    stats = {}
+    res = {}
+    for (k, benchmark) in enumerate(benchmarks):
+        params, samples = kept[benchmark]
+        ess, tau = benchstats.effective_sample_size(samples)
+        means, medians, block_length = [np.stack(field) for field in zip(*results[k * len(versions):(k + 1) * len(versions)])]
 
-    for version in list(benchmark_versions.keys()):
-        stats[version] = get_stats(benchmark, version)
+        res[benchmark] = (versions, params, Bootstrap(ess, tau, block_length, means, medians))
 
-    # Useful for verification
-    #pp = pprint.PrettyPrinter(indent=4)
-    #pp.pprint(stats)
+    return res
 
-    # We can use any key here; bench_params are same for all versions
-    bench_params = list(stats['_GCD_opt_none'].keys())
+def get_bootstrap(benchmark, versions = None, resamples = benchstats.bootstrap_resamples):
+    return bootstrap_benchmarks([benchmark], versions, resamples)[benchmark]
+
+# 'comparison' (see benchstats.welch_comparison) with the intervals of
+# the differences and speedups replaced by bootstrap percentile intervals,
+# taking the differences and ratios of the resampled means of every pair
+# of versions. As the tables show diff ± diff_ci, diff_ci is the larger
+# distance from the difference to either end of its interval.
+def bootstrap_comparison(comparison, bootstrap, confidence = 0.95):
+    means = bootstrap.means
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        lower, upper = benchstats.bootstrap_interval(means[:, np.newaxis] - means[np.newaxis, :], confidence)
+        speedup_lower, speedup_upper = benchstats.bootstrap_interval(means[:, np.newaxis] / means[np.newaxis, :], confidence)
+
+    return comparison._replace(
+        diff_ci = np.maximum(comparison.diff - lower, upper - comparison.diff),
+        speedup_lower = speedup_lower,
+        speedup_upper = speedup_upper)
+
+# Autocorrelation of every series of the benchmarks (all versions, or
+# only 'versions'), and the bootstrap intervals of their means, medians
+# and GCD - SC differences
+def print_autocorrelation_report(benchmarks = None, confidence = 0.95, versions = None):
+    for (benchmark, (versions, params, bootstrap)) in bootstrap_benchmarks(benchmarks, versions).items():
+        summary = benchstats.summarize(discard_warmup(get_samples(benchmark, versions)[1])[0])
+        mean_lower, mean_upper = benchstats.bootstrap_interval(bootstrap.means, confidence)
+        median_lower, median_upper = benchstats.bootstrap_interval(bootstrap.medians, confidence)
+
+        print('\n-- ' + benchmark + ': autocorrelation and block bootstrap (' + str(bootstrap.means.shape[-1]) + ' resamples) --\n')
+
+        for (i, version) in enumerate(versions):
+            for (j, bench_param) in enumerate(params):
+                if summary.n[i, j] == 0:
+                    continue
+
+                print('{:<14} N = {:<6} n {:>4}, ESS {:>6.1f} (tau {:>5.2f}, block {:>2}), mean {:0.4e} [{:0.4e}, {:0.4e}] (z-interval ± {:0.2e}), median {:0.4e} [{:0.4e}, {:0.4e}]'.format(
+                    benchmark_versions[version], bench_param, summary.n[i, j], bootstrap.ess[i, j], bootstrap.tau[i, j], bootstrap.block_length[i, j],
+                    summary.mean[i, j], mean_lower[i, j], mean_upper[i, j], summary.ci[i, j],
+                    summary.median[i, j], median_lower[i, j], median_upper[i, j]))
+
+        gcd = [i for (i, version) in enumerate(versions) if version.startswith('_GCD')]
+        sc = [i for (i, version) in enumerate(versions) if version.startswith('_SC')]
+
+        print()
+        for (a, b) in [(a, b) for a in gcd for b in sc]:
+            for (j, bench_param) in enumerate(params):
+                if summary.n[a, j] == 0 or summary.n[b, j] == 0:
+                    continue
+
+                mean_diff = benchstats.bootstrap_interval(bootstrap.means[a, j] - bootstrap.means[b, j], confidence)
+                median_diff = benchstats.bootstrap_interval(bootstrap.medians[a, j] - bootstrap.medians[b, j], confidence)
+
+                print('{} - {}, N = {:<6} mean {:+0.3e} [{:+0.3e}, {:+0.3e}], median {:+0.3e} [{:+0.3e}, {:+0.3e}]'.format(
+                    benchmark_versions[versions[a]], benchmark_versions[versions[b]], bench_param,
+                    summary.mean[a, j] - summary.mean[b, j], mean_diff[0], mean_diff[1],
+                    summary.median[a, j] - summary.median[b, j], median_diff[0], median_diff[1]))
+
+# Welch comparison of every pair of versions of a benchmark, for every
+# bench_param, after discarding the warm-up. The fields of 'comparison'
+# have shape (version_a x version_b x param) and compare version_a with
+# version_b (see benchstats.welch_comparison). Also returns the summary
+# of every series, as (versions, params, summary, comparison).
+def get_comparisons(benchmark, versions = None, confidence = 0.95):
+    if versions is None:
+        versions = list(benchmark_versions.keys())
+
+    params, samples = get_samples(benchmark, versions)
+    summary = benchstats.summarize(discard_warmup(samples)[0])
+    comparison = benchstats.welch_comparison(summary, confidence)
+
+    if ci_method == 'block_bootstrap':
+        comparison = bootstrap_comparison(comparison, get_bootstrap(benchmark, versions)[2], confidence)
+
+    return versions, params, summary, comparison
+
+# One row per benchmark, bench_param and ordered pair of different
+# versions (of all, or only 'versions') that both have samples for it
+def comparison_rows(benchmark, confidence = 0.95, versions = None):
+    versions, params, summary, comparison = get_comparisons(benchmark, versions, confidence)
+    rows = []
+
+    for (k, bench_param) in enumerate(params):
+        for (i, version_a) in enumerate(versions):
+            for (j, version_b) in enumerate(versions):
+                if i == j or summary.n[i, k] == 0 or summary.n[j, k] == 0:
+                    continue
+
+                diff = float(comparison.diff[i, j, k])
+                diff_ci = float(comparison.diff_ci[i, j, k])
+
+                rows.append({
+                    'benchmark': benchmark,
+                    'bench_param': int(bench_param),
+                    'version_a': version_a,
+                    'version_b': version_b,
+                    'n_a': int(summary.n[i, k]),
+                    'n_b': int(summary.n[j, k]),
+                    'mean_a': float(summary.mean[i, k]),
+                    'mean_b': float(summary.mean[j, k]),
+                    'diff': diff,
+                    'diff_ci': diff_ci,
+                    'df': float(comparison.df[i, j, k]),
+                    'speedup': float(comparison.speedup[i, j, k]),
+                    'speedup_lower': float(comparison.speedup_lower[i, j, k]),
+                    'speedup_upper': float(comparison.speedup_upper[i, j, k]),
+                    'significant': not contains_zero(diff, diff_ci)
+                })
+
+    return rows
+
+# Export the comparison of every pair of versions of every benchmark
+# (see comparison_rows) as CSV and as JSON, for use outside LaTeX
+def export_comparisons(benchmarks = None, csv_filename = 'comparisons.csv', json_filename = 'comparisons.json', confidence = 0.95, versions = None):
+    if benchmarks is None:
+        benchmarks = list(benchmark_titles.keys())
+
+    rows = []
+    for benchmark in benchmarks:
+        rows += comparison_rows(benchmark, confidence, versions)
+
+    # Nothing selected (or nothing to compare): the header would come
+    # from the first row, so nothing is written at all
+    if len(rows) == 0:
+        print('Nothing to export to', csv_filename, 'and', json_filename)
+        return
+
+    with open(csv_filename, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with open(json_filename, 'w') as f:
+        json.dump(rows, f, indent = 2)
+
+    print('Exported', len(rows), 'comparisons to', csv_filename, 'and', json_filename)
+
+# Generate LaTeX source code for confidence intervals (Welch's t-interval,
+# with the real number of samples of every series) for the difference
+# between means of GCD and SC versions
+def generate_comparison_tables(benchmark):
+    versions, params, summary, comparison = get_comparisons(benchmark)
 
     # 'tables' will contain mappings from bench_param to
-    # matrix of [diff, error] vectors
+    # matrix of [diff, error] vectors, GCD versions by SC versions
     #
     # So, for SpawnManyWaiting, for example, it could be:
     # {   2: [   [0.0011799612466711629, 0.0013675718674405314],
@@ -304,33 +631,25 @@ def generate_comparison_tables(benchmark):
     #            [-0.005062498750630778, 0.0010530800055075968],
     #            [0.0017240566678810854, 0.0013860009571363434]],
     #     4: [   [-0.003913242077687784, 0.002592025574439803],
-    #            [-0.0064503154088743075, 0.0025252629587746403],
-    #            [-0.0047027716564480015, 0.0024096340293675287],
-    #            [-0.004125995836220697, 0.002605834924001763],
-    #            [-0.006663069167407221, 0.002539435386765439],
-    #            [-0.004915525414980915, 0.0024244824660292507],
-    #            [-0.004331586254993469, 0.0026384847365148708],
-    #            [-0.006868659586179993, 0.0025729279308272916],
-    #            [-0.005121115833753687, 0.002459540868080453]],
+    #            ...
     #     ...
     # }
     tables = {}
 
-    for bench_param in bench_params:
-
-        tables[bench_param] = []
-
-        for GCD_version in list(benchmark_versions.keys())[:3]:
-            for SC_version in list(benchmark_versions.keys())[3:]:
-                (x_1, s2_1) = stats[GCD_version][bench_param]
-                (x_2, s2_2) = stats[SC_version][bench_param]
+    # Only the bench_params the GCD versions were run for
+    # (e.g. NQueens stops at 5 queens for GCD)
+    for (k, bench_param) in enumerate(params):
+        if summary.n[0, k] == 0:
+            continue
 
-                diff = x_1 - x_2
+        tables[int(bench_param)] = []
 
-                S = np.sqrt(s2_1 / 100 + s2_2 / 100)
-                error = S * 1.96 # 1.96 for 95% confidence, 3.291 for 99.9%
+        for GCD_version in range(3):
+            for SC_version in range(3, 6):
+                diff = comparison.diff[GCD_version, SC_version, k]
+                error = comparison.diff_ci[GCD_version, SC_version, k]
 
-                tables[bench_param].append([diff, error])
+                tables[int(bench_param)].append([float(diff), float(error)])
 
     # Useful for verification
     #pp = pprint.PrettyPrinter(indent=4)
@@ -338,6 +657,15 @@ def generate_comparison_tables(benchmark):
 
     latex_tables = generate_latex_tables(benchmark, tables)
 
+# Write the LaTeX tables of generate_comparison_tables
+# to 'Comparison-tables/<benchmark>.tex' instead of stdout
+def generate_comparison_tables_to_file(benchmark):
+    os.makedirs('Comparison-tables', exist_ok = True)
+
+    with open('Comparison-tables/' + benchmark + '.tex', 'w') as f:
+        with contextlib.redirect_stdout(f):
+            generate_comparison_tables(benchmark)
+
 # Generate LaTeX tables from data
 def generate_latex_tables(benchmark, tables):
 
@@ -397,6 +725,10 @@ def contains_zero(a, b):
     return abs(b) >= abs(a)
 
 #generate_comparison_tables('MatrixMultiplication')
+#export_comparisons()
+#print_warmup_report('Fibonacci')
+#write_iteration_plan()
+#print_autocorrelation_report(['Fibonacci'])
 
 # -- Base benchmarks --
 #plot_benchmark('SpawnManyWaiting')
@@ -408,4 +740,9 @@ def contains_zero(a, b):
 #plot_benchmark('NQueens')
 #plot_benchmark('MatrixMultiplication')
 
-#plot_all_benchmarks_to_file()
\ No newline at end of file
+#plot_all_benchmarks_to_file()
+
+# -- Tail latencies --
+#plot_benchmark('SpawnManyActors', percentiles = True)
+#plot_latency_histograms('SpawnManyWaitingGroup')
+#plot_all_tail_latencies_to_file()
\ No newline at end of file
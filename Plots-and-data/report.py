@@ -0,0 +1,466 @@
+import base64
+import html
+import json
+import os
+import numpy as np
+import decimate
+import logstore
+import plots
+
+# A single, self-contained HTML report of every memory consumption
+# profile and every per-iteration runtime series, which can be zoomed
+# in on down to the individual samples. It replaces the "zoomed in"
+# memory PNGs (one per bench_param position of every profile).
+#
+# Every series is stored as a pyramid of tiles: level 0 is one tile for
+# the whole series, and every following level has twice as many tiles,
+# each covering half as many samples. A tile holds the min/max envelope
+# of its samples in 'tile_columns' columns (see decimate.minmax_indices),
+# and the last level, whose tiles hold at most 2 * tile_columns samples,
+# holds every sample as it is. The viewer draws a series from the level
+# whose visible tiles together have at least one column per pixel, and
+# only decodes those tiles, so drawing costs the same at any zoom level.
+
+## Settings
+
+report_dir = 'Report'
+report_filename = 'index.html'
+
+# Columns (min/max pairs) per tile
+tile_columns = 256
+
+memory_color = '#2b60c0'
+
+# A tile's (x, y) points as base64 of little-endian float32: all x
+# values, then all y values. Float32 keeps runtimes to 7 significant
+# digits and profile times to well below the sampling interval.
+def encode_points(x_values, y_values):
+    return base64.b64encode(np.concatenate((x_values, y_values)).astype('<f4').tobytes()).decode('ascii')
+
+# The tile pyramid of a series, as a list of levels, each a list of
+# tiles {'x0', 'x1', 'points'}. 'x_values' must be ascending. Every tile
+# also holds the first sample of the next one, so that the lines of
+# neighbouring tiles join up.
+def tile_pyramid(x_values, y_values, columns = tile_columns):
+    n = len(y_values)
+    levels = []
+    tiles = 1
+
+    while True:
+        bounds = np.linspace(0, n, tiles + 1).astype(np.intp)
+        level = []
+
+        for (start, stop) in zip(bounds[:-1], bounds[1:]):
+            if stop == start:
+                continue
+
+            t = start + decimate.minmax_indices(y_values[start:stop], columns)
+            if stop < n:
+                t = np.append(t, stop)
+
+            level.append({
+                'x0': float(x_values[start]),
+                'x1': float(x_values[min(stop, n - 1)]),
+                'points': encode_points(x_values[t], y_values[t])
+            })
+
+        levels.append(level)
+
+        if n <= tiles * 2 * columns:
+            return levels
+
+        tiles *= 2
+
+def series_entry(label, color, x_values, y_values):
+    return {
+        'label': label,
+        'color': color,
+        'n': len(y_values),
+        'y_min': float(np.min(y_values)),
+        'y_max': float(np.max(y_values)),
+        'levels': tile_pyramid(x_values, y_values)
+    }
+
+# Per-iteration runtimes of every version of a benchmark in run order,
+# on one chart with a log y axis. Iteration k of bench_param j is at
+# x = j * iterations + k, so the versions line up per bench_param even
+# where some of them lack one (NQueens stops at 5 queens for GCD).
+def runtime_chart(benchmark):
+    versions = list(plots.benchmark_versions.keys())
+    params, samples = plots.get_samples(benchmark, versions)
+    iterations = samples.shape[2]
+    x_all = np.arange(len(params) * iterations, dtype = float)
+
+    series = []
+
+    for (i, version) in enumerate(versions):
+        y = samples[i].reshape(-1)
+        valid = ~np.isnan(y) & (y > 0)
+
+        if valid.any():
+            series.append(series_entry(plots.benchmark_versions[version], plots.version_colors[version], x_all[valid], y[valid]))
+
+    return {
+        'id': 'runtime-' + benchmark,
+        'title': plots.benchmark_titles[benchmark] + ': runtime of every iteration',
+        'x_label': 'Iteration (' + plots.benchmark_xlabels[benchmark] + ' in blocks of ' + str(iterations) + ')',
+        'y_label': 'Runtime (seconds)',
+        'log_y': True,
+        'fill': False,
+        'series': series,
+        'markers': [{'x': float(j * iterations), 'label': 'N = ' + str(bench_param)} for (j, bench_param) in enumerate(params)]
+    }
+
+# The memory consumption profile of one version of a benchmark, with
+# a marker at the start of every bench_param
+def memory_chart(benchmark, version):
+    mp = plots.memory_plots()
+    profile = logstore.load_memory_profile(mp.memory_filename(benchmark, version))
+
+    return {
+        'id': 'memory-' + benchmark + version,
+        'title': benchmark + ' memory consumption profile, ' + mp.benchmark_versions[version],
+        'x_label': 'Time (seconds)',
+        'y_label': 'Memory (Mb)',
+        'log_y': False,
+        'fill': True,
+        'series': [series_entry('Memory, ' + mp.benchmark_versions[version], memory_color, profile.seconds, profile.mb)],
+        'markers': [{'x': float(mp.position_seconds(profile, pos)), 'label': mp.benchmark_vline_label(benchmark, str(bench_param))}
+            for (bench_param, pos) in zip(profile.params, profile.positions)]
+    }
+
+# Every chart of the report, grouped by benchmark
+def report_sections(benchmarks = None):
+    if benchmarks is None:
+        benchmarks = list(plots.benchmark_titles.keys())
+
+    sections = []
+
+    for benchmark in benchmarks:
+        print('-- Tiling', benchmark, '--')
+        charts = [runtime_chart(benchmark)]
+
+        for version in plots.benchmark_versions.keys():
+            if os.path.exists(plots.memory_plots().memory_filename(benchmark, version)):
+                charts.append(memory_chart(benchmark, version))
+
+        sections.append({'benchmark': benchmark, 'charts': charts})
+
+    return sections
+
+# Write the report to 'Report/index.html' (or 'filename'). The page has
+# no dependencies: the tiles are embedded, and the viewer is plain
+# JavaScript drawing on a canvas per chart.
+def write_report(benchmarks = None, filename = None):
+    if filename is None:
+        filename = os.path.join(report_dir, report_filename)
+
+    sections = report_sections(benchmarks)
+
+    # '</' cannot appear in a script element
+    data = json.dumps(sections, separators = (',', ':')).replace('</', '<\\/')
+
+    body = ''
+    for section in sections:
+        body += '<h2>' + html.escape(section['benchmark']) + '</h2>\n'
+        for chart in section['charts']:
+            body += '<div class="chart" id="' + html.escape(chart['id']) + '"></div>\n'
+
+    page = report_template.replace('/*BODY*/', body).replace('/*COLUMNS*/', str(tile_columns)).replace('/*DATA*/', data)
+
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok = True)
+    with open(filename, 'w') as f:
+        f.write(page)
+
+    print('Wrote', filename, '(' + '{:0.1f}'.format(os.path.getsize(filename) / (1024 * 1024)) + ' Mb)')
+
+report_template = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Swift concurrency vs. GCD benchmarks</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; color: #222; }
+.chart { margin: 1.5em 0; }
+.chart h3 { font-size: 1em; margin: 0 0 .3em 0; }
+.chart canvas { width: 100%; height: 320px; border: 1px solid #ccc; cursor: grab; display: block; }
+.chart .controls { font-size: .85em; margin: .3em 0; }
+.chart .controls button { font-size: .85em; margin: 0 .2em .2em 0; }
+.chart .status { color: #888; margin-left: .5em; }
+</style>
+</head>
+<body>
+<h1>Swift concurrency vs. GCD benchmarks</h1>
+<p>Scroll to zoom in on the time axis, drag to pan, double-click to zoom out. The buttons zoom in on one bench_param.</p>
+/*BODY*/
+<script>
+var SECTIONS = /*DATA*/;
+var TILE_COLUMNS = /*COLUMNS*/;
+
+// Decoded tiles, by chart, series, level and tile index
+var decoded = {};
+
+function decodeTile(key, tile) {
+  if (!(key in decoded)) {
+    var bytes = atob(tile.points);
+    var buffer = new ArrayBuffer(bytes.length);
+    var view = new Uint8Array(buffer);
+    for (var i = 0; i < bytes.length; i++) view[i] = bytes.charCodeAt(i);
+    var values = new Float32Array(buffer);
+    var n = values.length / 2;
+    decoded[key] = { x: values.subarray(0, n), y: values.subarray(n) };
+  }
+  return decoded[key];
+}
+
+// Tick positions at 1, 2 or 5 times a power of ten
+function ticks(lo, hi, count) {
+  var step = Math.pow(10, Math.floor(Math.log10((hi - lo) / count)));
+  var err = (hi - lo) / count / step;
+  if (err >= 5) step *= 5; else if (err >= 2) step *= 2;
+  var res = [];
+  for (var t = Math.ceil(lo / step) * step; t <= hi; t += step) res.push(t);
+  return res;
+}
+
+function formatTick(v) {
+  if (v === 0) return '0';
+  var a = Math.abs(v);
+  return (a >= 1e4 || a < 1e-2) ? v.toExponential(1) : String(+v.toPrecision(4));
+}
+
+function Chart(element, chart) {
+  var self = this;
+  this.chart = chart;
+  this.x_min = Infinity; this.x_max = -Infinity;
+  this.y_min = Infinity; this.y_max = -Infinity;
+
+  chart.series.forEach(function (s) {
+    var top = s.levels[0][0];
+    self.x_min = Math.min(self.x_min, top.x0);
+    self.x_max = Math.max(self.x_max, top.x1);
+    self.y_min = Math.min(self.y_min, s.y_min);
+    self.y_max = Math.max(self.y_max, s.y_max);
+  });
+
+  if (chart.log_y) {
+    this.y_lo = Math.log10(this.y_min) - 0.05 * (Math.log10(this.y_max) - Math.log10(this.y_min));
+    this.y_hi = Math.log10(this.y_max) + 0.05 * (Math.log10(this.y_max) - Math.log10(this.y_min));
+  } else {
+    this.y_lo = 0;
+    this.y_hi = this.y_max * 1.05;
+  }
+
+  var span = this.x_max - this.x_min;
+  this.view = [this.x_min, this.x_max + 0.02 * span];
+
+  element.innerHTML = '<h3></h3><div class="controls"></div><canvas></canvas>';
+  element.querySelector('h3').textContent = chart.title;
+  this.canvas = element.querySelector('canvas');
+  this.controls = element.querySelector('.controls');
+
+  // One button per bench_param, zooming in on its part of the series
+  chart.markers.forEach(function (marker, i) {
+    var next = i + 1 < chart.markers.length ? chart.markers[i + 1].x : self.x_max;
+    var button = document.createElement('button');
+    button.textContent = marker.label;
+    button.onclick = function () { self.view = [marker.x, next + 0.02 * (next - marker.x)]; self.draw(); };
+    self.controls.appendChild(button);
+  });
+  this.status = document.createElement('span');
+  this.status.className = 'status';
+  this.controls.appendChild(this.status);
+
+  this.margin = { left: 70, right: 15, top: 10, bottom: 40 };
+  this.installHandlers();
+  this.draw();
+}
+
+Chart.prototype.plotWidth = function () {
+  return this.canvas.clientWidth - this.margin.left - this.margin.right;
+};
+
+Chart.prototype.toX = function (x) {
+  return this.margin.left + (x - this.view[0]) / (this.view[1] - this.view[0]) * this.plotWidth();
+};
+
+Chart.prototype.toY = function (y) {
+  var h = this.canvas.clientHeight - this.margin.top - this.margin.bottom;
+  var v = this.chart.log_y ? Math.log10(y) : y;
+  return this.margin.top + h - (v - this.y_lo) / (this.y_hi - this.y_lo) * h;
+};
+
+Chart.prototype.fromX = function (px) {
+  return this.view[0] + (px - this.margin.left) / this.plotWidth() * (this.view[1] - this.view[0]);
+};
+
+// The coarsest level whose visible tiles have a column per pixel
+Chart.prototype.level = function (series) {
+  var top = series.levels[0][0];
+  var fraction = (this.view[1] - this.view[0]) / Math.max(top.x1 - top.x0, 1e-12);
+  var wanted = Math.ceil(Math.log2(this.plotWidth() / (fraction * TILE_COLUMNS)));
+  return Math.max(0, Math.min(series.levels.length - 1, wanted));
+};
+
+Chart.prototype.draw = function () {
+  var self = this, chart = this.chart, canvas = this.canvas;
+  var ratio = window.devicePixelRatio || 1;
+  canvas.width = canvas.clientWidth * ratio;
+  canvas.height = canvas.clientHeight * ratio;
+
+  var ctx = canvas.getContext('2d');
+  ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+  ctx.clearRect(0, 0, canvas.clientWidth, canvas.clientHeight);
+
+  var left = this.margin.left, right = canvas.clientWidth - this.margin.right;
+  var top = this.margin.top, bottom = canvas.clientHeight - this.margin.bottom;
+
+  // Axes and ticks
+  ctx.strokeStyle = '#999'; ctx.fillStyle = '#444'; ctx.font = '11px sans-serif'; ctx.lineWidth = 1;
+  ctx.strokeRect(left, top, right - left, bottom - top);
+  ctx.textAlign = 'center';
+  ticks(this.view[0], this.view[1], 8).forEach(function (t) {
+    var px = self.toX(t);
+    ctx.beginPath(); ctx.moveTo(px, bottom); ctx.lineTo(px, bottom + 4); ctx.stroke();
+    ctx.fillText(formatTick(t), px, bottom + 15);
+  });
+  ctx.fillText(chart.x_label, (left + right) / 2, bottom + 32);
+
+  ctx.textAlign = 'right';
+  var y_ticks = chart.log_y
+    ? ticks(this.y_lo, this.y_hi, 5).map(function (t) { return Math.pow(10, t); })
+    : ticks(this.y_lo, this.y_hi, 5);
+  y_ticks.forEach(function (t) {
+    var py = self.toY(t);
+    ctx.beginPath(); ctx.moveTo(left - 4, py); ctx.lineTo(left, py); ctx.stroke();
+    ctx.fillText(formatTick(t), left - 6, py + 4);
+  });
+  ctx.save();
+  ctx.translate(12, (top + bottom) / 2); ctx.rotate(-Math.PI / 2); ctx.textAlign = 'center';
+  ctx.fillText(chart.y_label, 0, 0);
+  ctx.restore();
+
+  ctx.save();
+  ctx.beginPath(); ctx.rect(left, top, right - left, bottom - top); ctx.clip();
+
+  // bench_param markers
+  ctx.strokeStyle = '#1f77b4'; ctx.fillStyle = '#1f77b4'; ctx.textAlign = 'left';
+  chart.markers.forEach(function (marker) {
+    var px = self.toX(marker.x);
+    if (px < left || px > right) return;
+    ctx.beginPath(); ctx.moveTo(px, top); ctx.lineTo(px, bottom); ctx.stroke();
+    ctx.save(); ctx.translate(px + 3, bottom - 5); ctx.rotate(-Math.PI / 2); ctx.fillText(marker.label, 0, 0); ctx.restore();
+  });
+
+  // Only the tiles of the chosen level that overlap the view
+  var used = [];
+  chart.series.forEach(function (series, s) {
+    var level = self.level(series);
+    var tiles = series.levels[level];
+    var count = 0;
+
+    ctx.strokeStyle = series.color; ctx.lineWidth = 1;
+    ctx.fillStyle = chart.fill ? 'rgba(116, 162, 248, 0.5)' : series.color;
+
+    tiles.forEach(function (tile, i) {
+      if (tile.x1 < self.view[0] || tile.x0 > self.view[1]) return;
+      var points = decodeTile(chart.id + '/' + s + '/' + level + '/' + i, tile);
+      count++;
+
+      ctx.beginPath();
+      for (var k = 0; k < points.x.length; k++) {
+        var px = self.toX(points.x[k]), py = self.toY(points.y[k]);
+        if (k === 0) ctx.moveTo(px, py); else ctx.lineTo(px, py);
+      }
+      ctx.stroke();
+
+      if (chart.fill) {
+        ctx.lineTo(self.toX(points.x[points.x.length - 1]), bottom);
+        ctx.lineTo(self.toX(points.x[0]), bottom);
+        ctx.closePath();
+        ctx.fill();
+      }
+    });
+
+    used.push('level ' + level + '/' + (series.levels.length - 1) + ', ' + count + ' tile(s)');
+  });
+  ctx.restore();
+
+  // Legend
+  ctx.textAlign = 'left';
+  chart.series.forEach(function (series, s) {
+    ctx.fillStyle = series.color;
+    ctx.fillRect(left + 8, top + 8 + 14 * s, 10, 10);
+    ctx.fillStyle = '#222';
+    ctx.fillText(series.label, left + 22, top + 17 + 14 * s);
+  });
+
+  this.status.textContent = chart.series.length === 1 ? used[0] : '';
+};
+
+Chart.prototype.installHandlers = function () {
+  var self = this, canvas = this.canvas, dragging = null;
+
+  canvas.addEventListener('wheel', function (event) {
+    event.preventDefault();
+    var rect = canvas.getBoundingClientRect();
+    var at = self.fromX(event.clientX - rect.left);
+    var factor = Math.pow(1.0015, event.deltaY);
+    self.view = [at - (at - self.view[0]) * factor, at + (self.view[1] - at) * factor];
+    self.draw();
+  }, { passive: false });
+
+  canvas.addEventListener('mousedown', function (event) {
+    dragging = { x: event.clientX, view: self.view.slice() };
+    canvas.style.cursor = 'grabbing';
+  });
+
+  window.addEventListener('mousemove', function (event) {
+    if (!dragging) return;
+    var shift = (event.clientX - dragging.x) / self.plotWidth() * (dragging.view[1] - dragging.view[0]);
+    self.view = [dragging.view[0] - shift, dragging.view[1] - shift];
+    self.draw();
+  });
+
+  window.addEventListener('mouseup', function () {
+    dragging = null;
+    canvas.style.cursor = 'grab';
+  });
+
+  canvas.addEventListener('dblclick', function () {
+    var span = self.x_max - self.x_min;
+    self.view = [self.x_min, self.x_max + 0.02 * span];
+    self.draw();
+  });
+};
+
+// Charts are only set up (and their tiles decoded) once scrolled into view
+var charts = {};
+var observer = new IntersectionObserver(function (entries) {
+  entries.forEach(function (entry) {
+    if (entry.isIntersecting && !(entry.target.id in charts)) {
+      charts[entry.target.id] = new Chart(entry.target, byId[entry.target.id]);
+    }
+  });
+}, { rootMargin: '200px' });
+
+var byId = {};
+SECTIONS.forEach(function (section) {
+  section.charts.forEach(function (chart) {
+    byId[chart.id] = chart;
+    var element = document.getElementById(chart.id);
+    element.style.minHeight = '380px';
+    observer.observe(element);
+  });
+});
+
+window.addEventListener('resize', function () {
+  for (var id in charts) charts[id].draw();
+});
+</script>
+</body>
+</html>
+'''
+
+#write_report()
+#write_report(['Fibonacci'], 'Report/fibonacci.html')
@@ -0,0 +1,169 @@
+import os
+from collections import namedtuple
+import numpy as np
+import benchstats
+import logparser
+import logstore
+import plots
+
+# Speedup and parallel efficiency of every version of a benchmark along
+# a run dimension (the core count, thread count, ... of each log, see
+# logparser.read_run_dimensions), with Amdahl and Gustafson fits.
+# A benchmark's logs for one version and different core counts are e.g.
+#
+#   Official-execution-time/Fibonacci/Fibonacci_GCD_opt_none@cores=2
+#   Official-execution-time/Fibonacci/Fibonacci_GCD_opt_none@cores=4
+#
+# or have a 'Cores: 4' line before their first 'Running ...' header.
+
+## Settings
+
+default_dimension = 'cores'
+default_directory = 'Official-execution-time'
+
+# Every log of a benchmark in 'directory' that has a (numeric) value for
+# 'dimension', as a mapping from version to [(value, filename)], sorted
+# by value. The version is the part of the file name between the
+# benchmark and the first '@' tag, e.g. '_GCD_opt_none'.
+def find_logs(benchmark, dimension = default_dimension, directory = default_directory):
+    res = {}
+    benchmark_dir = os.path.join(directory, benchmark)
+
+    if not os.path.isdir(benchmark_dir):
+        return res
+
+    for name in sorted(os.listdir(benchmark_dir)):
+        filename = os.path.join(benchmark_dir, name)
+
+        if not name.startswith(benchmark) or not os.path.isfile(filename):
+            continue
+
+        value = logparser.read_run_dimensions(filename).get(dimension)
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+
+        version = name[len(benchmark):].split('@')[0]
+        res.setdefault(version, []).append((value, filename))
+
+    return {version: sorted(logs) for (version, logs) in res.items()}
+
+# Per version:
+#  units:       the dimension's values (e.g. core counts), ascending
+#  params:      bench_params
+#  runtime:     (unit x param) mean runtime, warm-up discarded
+#  speedup:     runtime at the fewest units / runtime
+#  efficiency:  speedup / (units / fewest units)
+Scaling = namedtuple('Scaling', ['units', 'params', 'runtime', 'speedup', 'efficiency'])
+
+def get_scaling(benchmark, dimension = default_dimension, directory = default_directory):
+    res = {}
+
+    for (version, logs) in find_logs(benchmark, dimension, directory).items():
+        units = np.array([value for (value, _) in logs])
+
+        # One row per unit count, bench_params aligned on their union
+        log_list = [logstore.load_execution_time_log(filename) for (_, filename) in logs]
+        params = np.unique(np.concatenate([log.params for log in log_list]))
+
+        samples = np.full((len(log_list), len(params), max([log.samples.shape[1] for log in log_list])), np.nan)
+        for (i, log) in enumerate(log_list):
+            samples[i, np.searchsorted(params, log.params), :log.samples.shape[1]] = log.samples
+
+        runtime = benchstats.summarize(plots.discard_warmup(samples)[0]).mean
+
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            speedup = runtime[0] / runtime
+            efficiency = speedup / (units / units[0])[:, np.newaxis]
+
+        res[version] = Scaling(units, params, runtime, speedup, efficiency)
+
+    return res
+
+# Amdahl's law, T(p) = T1 * (s + (1 - s) / p), is linear in 1/p:
+# T(p) = a + b / p with s = a / (a + b). Fitted by least squares to
+# every bench_param (column of 'runtime') at once. Returns the serial
+# fraction s and T1 = a + b, one per bench_param.
+def fit_amdahl(units, runtime):
+    x = 1 / np.asarray(units, dtype = float)[:, np.newaxis]
+    valid = ~np.isnan(runtime)
+    k = valid.sum(axis = 0)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean_x = np.sum(np.where(valid, x, 0), axis = 0) / k
+        mean_y = np.nansum(runtime, axis = 0) / k
+        dx = np.where(valid, x - mean_x, 0)
+        b = np.nansum(dx * (runtime - mean_y), axis = 0) / np.sum(dx**2, axis = 0)
+        a = mean_y - b * mean_x
+
+        return a / (a + b), a + b
+
+# Gustafson's law, S(p) = p - alpha * (p - 1), for the speedups relative
+# to p0 = the fewest units: the least-squares serial fraction alpha of
+# S(p) - p / p0 = -alpha * (p / p0 - 1), one per bench_param
+def fit_gustafson(units, speedup):
+    p = (np.asarray(units, dtype = float) / units[0])[:, np.newaxis]
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        return -np.nansum((p - 1) * (speedup - p), axis = 0) / np.sum(np.where(np.isnan(speedup), 0, (p - 1)**2), axis = 0)
+
+def amdahl_speedup(units, serial_fraction, base = 1):
+    units = np.asarray(units, dtype = float)
+    return (serial_fraction + (1 - serial_fraction) / base) / (serial_fraction + (1 - serial_fraction) / units)
+
+def print_scaling_report(benchmark, dimension = default_dimension, directory = default_directory):
+    for (version, scaling) in get_scaling(benchmark, dimension, directory).items():
+        serial, _ = fit_amdahl(scaling.units, scaling.runtime)
+        alpha = fit_gustafson(scaling.units, scaling.speedup)
+
+        print('\n-- ' + benchmark + version + ' over ' + dimension + ' ' + ', '.join(['{:g}'.format(u) for u in scaling.units]) + ' --\n')
+
+        for (j, bench_param) in enumerate(scaling.params):
+            print('N = {:<6} speedup {:>6.2f}, efficiency {:>5.1%} at {:g} {}, Amdahl serial fraction {:0.3f} (max speedup {:0.1f}), Gustafson {:0.3f}'.format(
+                int(bench_param), scaling.speedup[-1, j], scaling.efficiency[-1, j], scaling.units[-1], dimension,
+                serial[j], 1 / serial[j] if serial[j] > 0 else np.inf, alpha[j]))
+
+# Speedup and efficiency against the dimension for the largest
+# bench_param of every version, with the Amdahl fit and ideal scaling
+def plot_scaling(benchmark, dimension = default_dimension, directory = default_directory, bench_param = None, save_to_file = False):
+    plt = plots.pyplot()
+    fig, (speedup_ax, efficiency_ax) = plt.subplots(1, 2, figsize = (12, 5))
+    units = None
+
+    for (version, scaling) in get_scaling(benchmark, dimension, directory).items():
+        j = len(scaling.params) - 1 if bench_param is None else int(np.searchsorted(scaling.params, bench_param))
+        color = plots.version_colors.get(version)
+        # Matplotlib leaves labels starting with '_' out of the legend
+        label = plots.benchmark_versions.get(version, version.lstrip('_'))
+        units = scaling.units
+
+        speedup_ax.plot(scaling.units, scaling.speedup[:, j], marker = '.', color = color, label = label)
+        efficiency_ax.plot(scaling.units, scaling.efficiency[:, j], marker = '.', color = color, label = label)
+
+        serial, _ = fit_amdahl(scaling.units, scaling.runtime)
+        fine_units = np.linspace(scaling.units[0], scaling.units[-1], 100)
+        speedup_ax.plot(fine_units, amdahl_speedup(fine_units, serial[j], scaling.units[0]), color = color, linestyle = ':', linewidth = .8)
+
+    if units is not None:
+        speedup_ax.plot(units, units / units[0], color = 'grey', linestyle = '--', linewidth = .8, label = 'Ideal')
+        efficiency_ax.axhline(1, color = 'grey', linestyle = '--', linewidth = .8)
+
+    speedup_ax.set_xlabel(dimension.capitalize())
+    speedup_ax.set_ylabel('Speedup (dotted: Amdahl fit)')
+    efficiency_ax.set_xlabel(dimension.capitalize())
+    efficiency_ax.set_ylabel('Parallel efficiency')
+    efficiency_ax.set_ylim([0, max(1.1, efficiency_ax.get_ylim()[1])])
+    speedup_ax.legend()
+    fig.suptitle(benchmark + ' scaling over ' + dimension)
+
+    if save_to_file:
+        os.makedirs('Scaling-plots', exist_ok = True)
+        fig.savefig('Scaling-plots/' + benchmark + '_' + dimension, dpi = 250)
+        plt.close(fig)
+    else:
+        plt.show()
+
+#print_scaling_report('Fibonacci', 'workers', 'Python-execution-time')
+#plot_scaling('Fibonacci', 'workers', 'Python-execution-time')
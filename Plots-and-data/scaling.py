@@ -0,0 +1,187 @@
+from collections import namedtuple
+from math import factorial
+import numpy as np
+import benchstats
+import plots
+
+## Settings
+
+# Points whose relative residual exceeds this many times the median
+# absolute relative residual of their fit (and at least
+# min_outlier_residual) are flagged as breaking from the model
+outlier_factor = 3
+min_outlier_residual = 0.1
+
+# A fit is rejected, and not extrapolated, when its model explains less
+# than this fraction of the variation (R^2)...
+min_r_squared = 0.8
+
+# ...unless its RMS relative error is within this anyway: runtimes that
+# barely grow with N have a low R^2 however well the model fits them
+rms_error_tolerance = 0.05
+
+# Seconds every task of SpawnManyWaiting sleeps (as in BenchApp). The
+# tasks run one after another, so each wait adds to the per-task cost.
+wait_seconds = 0.1
+
+# Number of calls the naive recursive fib(n) makes
+def fibonacci_calls(n):
+    calls = [1, 1]
+    for _ in range(2, int(n) + 1):
+        calls.append(calls[-1] + calls[-2] + 1)
+    return calls[int(n)]
+
+# Every benchmark is modelled as
+#
+#   runtime = fixed + (unit_cost + unit_wait) * work(N)
+#
+# where work(N) counts the units of work the benchmark does for N, and
+# unit_wait is the known time each unit spends sleeping, which is taken
+# off the runtimes before fitting so that unit_cost is the overhead only.
+# (The SpawnManyWaitingGroup tasks wait concurrently, so their wait is
+# part of the fixed cost, or of the per-task cost once GCD runs out of
+# threads, and it is left in.)
+ScalingModel = namedtuple('ScalingModel', ['name', 'unit', 'work', 'unit_wait'])
+
+scaling_models = {
+    'SpawnManyWaiting': ScalingModel('linear', 'task', lambda n: n, wait_seconds),
+    'SpawnManyWaitingGroup': ScalingModel('linear', 'task', lambda n: n, 0),
+    'SpawnManyActors': ScalingModel('linear', 'actor', lambda n: n, 0),
+    'Fibonacci': ScalingModel('exponential', 'call', fibonacci_calls, 0),
+    'NQueens': ScalingModel('factorial', 'N!', factorial, 0),
+    'MatrixMultiplication': ScalingModel('cubic', 'multiply-add', lambda n: n**3, 0)
+}
+
+# All fields have one entry per version:
+#  fixed, unit_cost:  the fitted coefficients, in seconds
+#  r_squared:         coefficient of determination of the (relative) fit
+#  rms_error:         root mean square of the relative residuals
+#  residuals:         (version x param) relative residuals, NaN where
+#                     there was no measurement
+#  outliers:          (version x param) mask of flagged points
+#  rejected:          whether the model does not describe the version's
+#                     runtimes (see min_r_squared)
+ScalingFit = namedtuple('ScalingFit', ['fixed', 'unit_cost', 'r_squared', 'rms_error', 'residuals', 'outliers', 'rejected'])
+
+def work_of(benchmark, params):
+    return np.array([float(scaling_models[benchmark].work(n)) for n in params])
+
+# Fit fixed + unit_cost * work to the (version x param) mean runtimes,
+# all versions at once. The residuals are weighted by 1 / mean, i.e.
+# the relative error is minimized, as runtimes span several orders of
+# magnitude and a plain fit would only ever see the largest N. A fixed
+# cost cannot be negative, so where the fit gives one, the version is
+# refitted through the origin (fixed = 0) instead.
+def fit_means(work, means):
+    valid = ~np.isnan(means)
+    w = np.where(valid, 1 / np.where(valid, means, 1), 0)**2
+
+    x = np.broadcast_to(work, means.shape)
+    y = np.where(valid, means, 0)
+
+    # Weighted normal equations of the two coefficients, per version
+    s = np.sum(w, axis = -1)
+    sx = np.sum(w * x, axis = -1)
+    sxx = np.sum(w * x * x, axis = -1)
+    sy = np.sum(w * y, axis = -1)
+    sxy = np.sum(w * x * y, axis = -1)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        det = s * sxx - sx**2
+        fixed = (sxx * sy - sx * sxy) / det
+        unit_cost = (s * sxy - sx * sy) / det
+
+        through_origin = fixed < 0
+        fixed = np.where(through_origin, 0, fixed)
+        unit_cost = np.where(through_origin, sxy / sxx, unit_cost)
+
+        predicted = fixed[:, np.newaxis] + unit_cost[:, np.newaxis] * x
+        residuals = np.where(valid, (means - predicted) / means, np.nan)
+
+        rms_error = np.sqrt(np.nanmean(residuals**2, axis = -1))
+
+        # Weighted, like the fit: the weighted squared residuals are
+        # the squared relative residuals
+        mean_y = sy / s
+        total = np.sum(w * (y - mean_y[:, np.newaxis])**2, axis = -1)
+        r_squared = 1 - np.nansum(residuals**2, axis = -1) / total
+
+    mad = np.nanmedian(np.abs(residuals), axis = -1)
+    threshold = np.maximum(outlier_factor * mad, min_outlier_residual)
+    outliers = np.abs(np.nan_to_num(residuals)) > threshold[:, np.newaxis]
+
+    # NaN (e.g. no measurements at all) compares False, so is rejected too
+    rejected = ~((r_squared >= min_r_squared) | (rms_error <= rms_error_tolerance))
+
+    return ScalingFit(fixed, unit_cost, r_squared, rms_error, residuals, outliers, rejected)
+
+# Fit the scaling model of a benchmark to every version's mean runtime
+# (warm-up discarded), less the known waits (see ScalingModel).
+# Returns (versions, params, fit).
+def fit_benchmark(benchmark):
+    versions = list(plots.benchmark_versions.keys())
+    params, samples = plots.get_samples(benchmark, versions)
+    summary = benchstats.summarize(plots.discard_warmup(samples)[0])
+    work = work_of(benchmark, params)
+
+    return versions, params, fit_means(work, summary.mean - scaling_models[benchmark].unit_wait * work)
+
+# Predicted runtime (seconds, waits included) of every version at every
+# N in 'params', as a (version x param) array; N may lie beyond the
+# measured range. Versions whose fit was rejected get NaN.
+def extrapolate(benchmark, fit, params):
+    work = work_of(benchmark, params)
+    predicted = fit.fixed[:, np.newaxis] + (fit.unit_cost[:, np.newaxis] + scaling_models[benchmark].unit_wait) * work
+
+    return np.where(fit.rejected[:, np.newaxis], np.nan, predicted)
+
+# The N after the last one a version was measured for, one step (the
+# last difference between its bench_params) further
+def next_param(params, measured):
+    own = params[measured]
+
+    if len(own) < 2:
+        return None
+
+    return int(own[-1] + (own[-1] - own[-2]))
+
+# With 'extrapolate_to' unset, every version is extrapolated to the N
+# after its own last measured one (see next_param)
+def print_scaling_report(benchmark, extrapolate_to = None):
+    versions, params, fit = fit_benchmark(benchmark)
+    model = scaling_models[benchmark]
+
+    print('\n-- ' + benchmark + ' (' + model.name + ' model) --\n')
+
+    for (i, version) in enumerate(versions):
+        line = '{:<16} {:>12.3f} ns per {:<13} fixed {:>10.3e} s, R^2 = {:0.4f}, RMS error {:0.1%}'.format(
+            version, fit.unit_cost[i] * 1e9, model.unit, fit.fixed[i], fit.r_squared[i], fit.rms_error[i])
+
+        if model.unit_wait > 0:
+            line += ' (plus the {:g} s wait per {})'.format(model.unit_wait, model.unit)
+
+        if fit.rejected[i]:
+            print(line + ', model rejected')
+            continue
+
+        targets = extrapolate_to
+        if targets is None:
+            target = next_param(params, ~np.isnan(fit.residuals[i]))
+            targets = [] if target is None else [target]
+
+        predicted = extrapolate(benchmark, fit, targets)
+
+        for (n, seconds) in zip(targets, predicted[i]):
+            line += ', N = {}: {:0.3e} s'.format(n, seconds)
+
+        print(line)
+
+        for j in np.flatnonzero(fit.outliers[i]):
+            print('    N = {} breaks from the model ({:+0.1%})'.format(params[j], fit.residuals[i, j]))
+
+def print_all_scaling_reports():
+    for benchmark in plots.benchmark_titles.keys():
+        print_scaling_report(benchmark)
+
+#print_scaling_report('SpawnManyWaiting', extrapolate_to = [100, 1000])
+#print_all_scaling_reports()
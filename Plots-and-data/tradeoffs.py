@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import numpy as np
+import benchstats
+import logstore
+import memstats
+import plots
+
+# Runtime against memory of every version of a benchmark, joining the
+# execution time log and the memory consumption profile of each
+# benchmark/version/bench_param. Both logs come from the same BenchApp
+# harness, so a memory segment runs as many iterations as the execution
+# time log says its run did.
+
+# Mask of the points on the Pareto frontier when minimizing both
+# coordinates: those that no other point is at least as good as in
+# both and strictly better in one. NaN points are never on it.
+def pareto_front(x_values, y_values):
+    x = np.asarray(x_values, dtype = float)
+    y = np.asarray(y_values, dtype = float)
+
+    with np.errstate(invalid = 'ignore'):
+        no_worse = (x[:, np.newaxis] <= x[np.newaxis, :]) & (y[:, np.newaxis] <= y[np.newaxis, :])
+        better = (x[:, np.newaxis] < x[np.newaxis, :]) | (y[:, np.newaxis] < y[np.newaxis, :])
+
+    # dominated[j]: some point i is no worse than j and better in one
+    dominated = (no_worse & better).any(axis = 0)
+    return ~dominated & ~np.isnan(x) & ~np.isnan(y)
+
+# One row per version and bench_param that has both a runtime and a
+# memory segment with samples:
+#  runtime:               mean seconds per iteration (warm-up discarded)
+#  peak_mb:               peak memory of the segment
+#  mb_seconds_per_iteration: area under the memory curve of the segment
+#                         divided by the iterations it ran
+#  peak_mb_per_throughput: peak memory per iteration per second, i.e.
+#                         peak_mb * runtime; lower is a better balance
+#  pareto:                whether no other version of the bench_param is
+#                         both faster and lighter (see pareto_front)
+def join(benchmark):
+    versions = list(plots.benchmark_versions.keys())
+    params, samples = plots.get_samples(benchmark, versions)
+    summary = benchstats.summarize(plots.discard_warmup(samples)[0])
+
+    rows = []
+
+    for (i, version) in enumerate(versions):
+        memory_file = plots.memory_plots().memory_filename(benchmark, version)
+
+        if not os.path.exists(memory_file):
+            continue
+
+        log = logstore.load_execution_time_log(plots.execution_time_filename(benchmark, version))
+        iterations = dict(zip(log.params.tolist(), log.iterations.tolist()))
+
+        for segment in memstats.profile_segments(memory_file):
+            j = np.searchsorted(params, segment.param)
+
+            if j == len(params) or params[j] != segment.param or np.isnan(segment.peak) or summary.n[i, j] == 0:
+                continue
+
+            runtime = float(summary.mean[i, j])
+
+            rows.append({
+                'benchmark': benchmark,
+                'version': version,
+                'bench_param': segment.param,
+                'runtime': runtime,
+                'peak_mb': segment.peak,
+                'mb_seconds_per_iteration': segment.auc / iterations[segment.param],
+                'peak_mb_per_throughput': segment.peak * runtime
+            })
+
+    # Frontier among the versions of each bench_param
+    for bench_param in set([row['bench_param'] for row in rows]):
+        group = [row for row in rows if row['bench_param'] == bench_param]
+        front = pareto_front([row['runtime'] for row in group], [row['peak_mb'] for row in group])
+
+        for (row, on_front) in zip(group, front):
+            row['pareto'] = bool(on_front)
+
+    return sorted(rows, key = lambda row: (row['bench_param'], versions.index(row['version'])))
+
+# Export the joined rows of every benchmark as CSV and JSON
+def export_tradeoffs(benchmarks = None, csv_filename = 'tradeoffs.csv', json_filename = 'tradeoffs.json'):
+    if benchmarks is None:
+        benchmarks = list(plots.benchmark_titles.keys())
+
+    rows = []
+    for benchmark in benchmarks:
+        rows += join(benchmark)
+
+    # Nothing selected (or nothing to compare): the header would come
+    # from the first row, so nothing is written at all
+    if len(rows) == 0:
+        print('Nothing to export to', csv_filename, 'and', json_filename)
+        return
+
+    with open(csv_filename, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with open(json_filename, 'w') as f:
+        json.dump(rows, f, indent = 2)
+
+    print('Exported', len(rows), 'rows to', csv_filename, 'and', json_filename)
+
+# Versions on the frontier of every bench_param of a benchmark
+def print_pareto_report(benchmark):
+    rows = join(benchmark)
+
+    for bench_param in sorted(set([row['bench_param'] for row in rows])):
+        front = [plots.benchmark_versions[row['version']] for row in rows if row['bench_param'] == bench_param and row['pareto']]
+        print(benchmark, 'N =', bench_param, '->', ', '.join(front))
+
+# One scatter plot of runtime against peak memory per bench_param, in
+# the version colors, with the Pareto frontier drawn through its points
+def plot_tradeoffs(benchmark, save_to_file = False):
+    plt = plots.pyplot()
+    rows = join(benchmark)
+
+    for bench_param in sorted(set([row['bench_param'] for row in rows])):
+        group = [row for row in rows if row['bench_param'] == bench_param]
+        fig, ax = plt.subplots(figsize = (6, 5))
+
+        for row in group:
+            ax.scatter(row['runtime'], row['peak_mb'],
+                color = plots.version_colors[row['version']],
+                marker = 'o' if row['pareto'] else 'x',
+                label = plots.benchmark_versions[row['version']])
+
+        front = sorted([(row['runtime'], row['peak_mb']) for row in group if row['pareto']])
+        ax.step([x for (x, y) in front], [y for (x, y) in front], where = 'post', color = 'grey', linestyle = '--', linewidth = .8)
+
+        ax.set_xlabel('Runtime (seconds per iteration)')
+        ax.set_ylabel('Peak memory (Mb)')
+        ax.set_title(benchmark + ', N = ' + str(bench_param))
+        ax.legend(fontsize = 'small')
+
+        if save_to_file:
+            os.makedirs('Tradeoff-plots/' + benchmark, exist_ok = True)
+            fig.savefig('Tradeoff-plots/' + benchmark + '/' + benchmark + '_' + str(bench_param), dpi = 250)
+            plt.close(fig)
+
+    if not save_to_file:
+        plt.show()
+
+#print_pareto_report('MatrixMultiplication')
+#plot_tradeoffs('Fibonacci')
+#export_tradeoffs()